@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# The following example shows how to read a dataset
+# directly from a tar or zip archive.
+#
+
+import os
+import tarfile
+import zipfile
+from itypes import Dataset, File, ArchiveFileSystem
+
+# Write a dataset and pack it
+ds = Dataset(file='out_read_archive/dataset/data.json')
+ds.var.create("image", "image0")
+ds.var.create("flow", "flow")
+with ds.seq.group('scene_001') as group:
+    for idx in range(2):
+        with group.item() as item:
+            item["image0"].set_data(File(f'../data/scene1/000{idx}-image0.png').read())
+            item["flow"].set_data(File(f'../data/scene1/000{idx}-flow.flo').read())
+ds.write()
+
+with tarfile.open('out_read_archive/dataset.tar', 'w') as tar:
+    for name in sorted(os.listdir('out_read_archive/dataset')):
+        tar.add(f'out_read_archive/dataset/{name}', arcname=name)
+
+with zipfile.ZipFile('out_read_archive/dataset.zip', 'w', zipfile.ZIP_STORED) as zip:
+    for dir, dirs, files in os.walk('out_read_archive/dataset'):
+        for name in files:
+            zip.write(os.path.join(dir, name), os.path.relpath(os.path.join(dir, name), 'out_read_archive/dataset'))
+
+# Mount the archives, by default at their own path
+for archive in ['out_read_archive/dataset.tar', 'out_read_archive/dataset.zip']:
+    afs = ArchiveFileSystem(archive)
+    print(afs)
+
+    ds = Dataset(f'{archive}/data.json').read()
+    for item in ds:
+        image = item["image0"].data()
+        flow = item["flow"].data()
+        print(f"  {item['image0'].file()}: image {image.shape}, flow {flow.shape}")
+
+    afs.close()
+
+print(f"Member index: {sorted(name for name in os.listdir('out_read_archive') if name.endswith('.npz'))}")
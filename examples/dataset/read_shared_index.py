@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# The following demonstrates how to share a read-only
+# dataset with worker processes.
+#
+
+#
+# Generate a dataset
+#
+import os
+
+print()
+print("Running: \"python3 ./write_from_files.py > /dev/null\"")
+os.system("python3 ./write_from_files.py > /dev/null")
+print()
+print()
+
+from multiprocessing import Pool
+from itypes import Dataset
+
+
+def load(args):
+    index, i = args
+    # Workers attach to the shared memory block, the
+    # dataset registry itself is never touched
+    item = index[i]
+    return item.id(), item["image0"].data().shape
+
+
+if __name__ == "__main__":
+    # Read-only datasets never write to their registry
+    ds = Dataset("out_write_from_files/data.json", readonly=True).read()
+
+    # Export item ids and values into shared memory
+    with ds.export_shared(["image0", "flow"]) as index:
+        print(f'Shared index: {len(index)} items, {index.nbytes()} bytes')
+        print(f'ds[0]["flow"].file()    = {ds[0]["flow"].file()}')
+        print(f'index[0]["flow"].file() = {index[0]["flow"].file()}')
+        print()
+
+        with Pool(2) as pool:
+            for id, shape in pool.map(load, [(index, i) for i in range(len(index))]):
+                print(f'{id}: image0 {shape}')
+        print()
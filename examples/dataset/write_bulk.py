@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# The following example shows how to create a dataset from
+# existing files in one go, without creating groups and items
+# one by one.
+#
+
+from itypes import Dataset
+
+# Create sequence
+ds = Dataset(file='out_write_bulk/data.json')
+
+# First row: show images and flow
+with ds.viz.new_row() as row:
+    row.add_cell("image", var="image0")
+    row.add_cell("image", var="image1")
+    row.add_cell("flow",  var="flow")
+
+# Insert rows (one dict per item)
+ds.seq.extend([
+    {"group_id": "scene_001", "group_label": "Scene 1", "item_id": "item_001",
+     "image0": '../data/scene1/0000-image0.png', "image1": '../data/scene1/0000-image1.png', "flow": '../data/scene1/0000-flow.flo'},
+    {"group_id": "scene_001", "group_label": "Scene 1", "item_id": "item_002",
+     "image0": '../data/scene1/0001-image0.png', "image1": '../data/scene1/0001-image1.png', "flow": '../data/scene1/0001-flow.flo'},
+])
+
+# Insert columns (one list or array per field, e.g. a pandas DataFrame)
+ds.bulk_insert({
+    "group_id": ["scene_002"],
+    "group_label": ["Scene 2"],
+    "item_id": ["item_001"],
+    "image0": ['../data/scene2/0000-image0.png'],
+    "image1": ['../data/scene2/0000-image1.png'],
+    "flow": ['../data/scene2/0000-flow.flo'],
+})
+
+ds.write()
+
+print(ds)
+
+print()
+print("To view run: \"iviz out_write_bulk/data.json\"")
+print()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+import os
+from itypes import File, Path, Dataset
+from itypes.filesystem.caching import CachingFileSystem
+
+# out_caching/remote stands in for a network directory
+remote = Path('out_caching/remote').abs()
+remote.mkdir()
+cfs = CachingFileSystem(remote, 'out_caching/cache', flush_delay=0.1)
+
+image = File('../data/test-rgb.png').read()
+File(remote.file('test-rgb.png')).write(image)
+File(remote.file('test.txt')).write('first')
+File(remote.file('test.txt')).write('second')
+print(f"Stats after writing: {cfs.stats()}")
+
+cfs.flush()
+print(f"Stats after flush(): {cfs.stats()}")
+print(f"Files in remote directory: {sorted(os.listdir(remote.str()))}")
+
+data = File(remote.file('test-rgb.png')).read()
+print(f"Read test-rgb.png with size {data.shape}")
+print(f"Read-back of test.txt: \"{File(remote.file('test.txt')).read()}\"")
+
+# Files changed in the remote directory are fetched again
+with open(remote.file('test.txt').str(), 'w') as f:
+    f.write('changed remotely')
+print(f"Read-back of test.txt: \"{File(remote.file('test.txt')).read()}\"")
+print(f"Stats after reading: {cfs.stats()}")
+
+# Dataset.write() waits until the dataset is stored in the remote directory
+ds = Dataset(remote.cd('dataset').file('data.json'))
+ds.var.create('image', 'image')
+with ds.seq.group('000000') as group:
+    for i in range(3):
+        group.item()['image'].set_data(image)
+ds.write()
+print(f"Stats after Dataset.write(): {cfs.stats()}")
+print(f"Dataset in remote directory: {sorted(os.listdir(remote.cd('dataset').str()))}")
+print(f"Read back {len(Dataset(remote.cd('dataset').file('data.json')).read())} items")
+
+cfs.unmount()
@@ -39,4 +39,12 @@ print(mfs, end='')
 data = File('/memory/test-rgb-writeback.png').read()
 print(f'Read test-rgb-writeback.png with size {data.shape}')
 
-mfs.write_to_disk('out_memory')
\ No newline at end of file
+mfs.write_to_disk('out_memory')
+# With a capacity, the least recently used files are moved to disk
+scratch = MemoryFileSystem('/scratch', capacity=2 * 1024 * 1024)
+scratch.read_from_disk('../data')
+for name in ['test-rgb.png', 'test-mask.png', 'test.flo', 'test-rgb.png']:
+    data = File(f'/scratch/{name}').read()
+    print(f'Read {name} with size {data.shape}')
+print(f'Scratch stats: {scratch.stats()}')
+scratch.unmount()
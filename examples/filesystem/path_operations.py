@@ -28,6 +28,12 @@ for ent in path.list_files():
     print(f"  '{str(ent)}', type={type(ent)}")
 print()
 
+# Search files recursively, skipping directories named subdir*
+print("Path('../data').iter_files('*.png', prune='subdir*'):")
+for ent in path.iter_files('*.png', prune='subdir*'):
+    print(f"  '{str(ent)}'")
+print()
+
 # cd, abs, part, name
 path = Path('.').cd('../data')
 print(f"Path('.').cd('../data'):               {path}")
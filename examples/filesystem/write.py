@@ -51,6 +51,10 @@ test('test-mask.png', dtype=np.uint16)
 test('test-mask.png', dtype=np.float32)
 print()
 
+test('test-rgb.exr')
+test('test-gray.exr')
+print()
+
 test('test.pfm')
 print()
 
@@ -14,4 +14,17 @@ log.info("This is an informational message")
 log.notice("This is a notice message")
 log.warning("This is a warning message")
 log.error("This is an error message")
-log.confirm("This is a confirmation message")
\ No newline at end of file
+log.confirm("This is a confirmation message")
+
+# Messages with a key are rate limited per key, the number
+# of suppressed messages is reported by summarize()
+log.set_rate_limit(3)
+for i in range(0, 10):
+    log.warning(f"File {i} is missing", key="missing files")
+log.summarize()
+
+# Messages can be written as JSON lines and filtered by level
+log.set_format("json")
+log.set_level("WARNING")
+log.info("This message is filtered out")
+log.warning("This is a warning message in JSON")
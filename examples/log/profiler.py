@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+from itypes import File, data_root, profile, profiler, pprint
+
+# Counters and timers are collected only inside the with block,
+# a report is printed via log on exit
+with profile():
+    for i in range(0, 3):
+        File(data_root.file('test-rgb.png')).read()
+    File(data_root.file('test.json')).read()
+
+# The collected values can also be exported as a dict
+pprint(profiler.to_dict())
@@ -91,3 +91,49 @@ print(a)
 print('split_batch second entry:')
 print(b)
 print()
+
+
+print('iter_batch entries:')
+# NOTE: entries are created one at a time
+for entry in q.iter_batch():
+    print(entry)
+
+
+print('batch_view of second entry:')
+# NOTE: members are extracted on access, arrays are views into q
+view = q.batch_view(1)
+print('view.x.shape:', view.x.shape)
+print('view.int_value:', view.int_value)
+print('view.y.z.shape:', view.y.z.shape)
+print()
+
+
+from itypes import BatchCollator
+
+# NOTE: the collator reuses its buffers, a batch is
+# overwritten two collate() calls later (num_buffers=2)
+collator = BatchCollator(num_buffers=2)
+r = collator.collate([s, s, s])
+print('collated batch:')
+print(r)
+print()
+
+
+import pickle
+
+# NOTE: all arrays of p are views into a single buffer,
+# which pickle transfers in one piece
+p = s.pack()
+print('packed buffer:', p.packed_buffer().nbytes, 'bytes')
+p = pickle.loads(pickle.dumps(p, protocol=5))
+print('unpickled packed struct:')
+print(p)
+print()
+
+# NOTE: arrays assigned after pack() are not in the buffer,
+# they are pickled with their current contents
+p.mask = np.zeros(3)
+pickle.dumps(p, protocol=5)
+p.mask[0] = 1
+print('mask after unpickling:', pickle.loads(pickle.dumps(p, protocol=5)).mask)
+print()
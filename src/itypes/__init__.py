@@ -15,6 +15,8 @@ from .filesystem import register_file_system
 from .filesystem import unregister_file_system
 from .filesystem import read_parallel
 from .filesystem import MemoryFileSystem
+from .filesystem import CachingFileSystem
+from .filesystem import ArchiveFileSystem
 
 from .filesystem import File
 from .filesystem import Path
@@ -60,8 +62,10 @@ from .struct import ListKey
 from .struct import Struct
 from .struct import NumpyStruct
 from .struct import TorchStruct
+from .struct import BatchCollator
 
 from .dataset import Dataset
+from .dataset import SharedIndex
 from .dataset import register_visualization
 
 from .properties import Properties
@@ -72,8 +76,12 @@ from .paths import itypes_root
 from .paths import data_root
 from .paths import exapmles_root
 
+from .profiler import profiler
+from .profiler import profile
+
 from .log import TraceLogger
 from .log import set_trace_level
+from .log import set_trace_sink
 from .log import log
 
 from .grid2d import Grid2D
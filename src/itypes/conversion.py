@@ -8,8 +8,10 @@
 ### --------------------------------------- ###
 
 from .type import is_numpy, is_torch
+from .profiler import profiled
 
 
+@profiled("convert_dims")
 def convert_dims(data, old, new):
     import numpy as np
 
@@ -70,6 +72,7 @@ def convert_dims(data, old, new):
     # We should have returned already
     raise Exception("Invalid state encountered")
 
+@profiled("convert_dtype")
 def convert_dtype(data, new):
     if data is None or new is None:
         return data
@@ -163,6 +166,7 @@ def convert_dtype(data, new):
         # We should have returned already
         raise Exception("Invalid state encountered")
 
+@profiled("convert_device")
 def convert_device(data, device):
     if data is None or device is None:
         return data
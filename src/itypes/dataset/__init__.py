@@ -8,4 +8,5 @@
 ### --------------------------------------- ###
 
 from .dataset import Dataset
+from ._shared_index import SharedIndex
 from .visualizations import register_visualization
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+import os
+import threading
+from ..filesystem.io import copy_file, link_file, file_digest, _is_filesystem_file, _same_file
+from ..profiler import profiler
+
+
+def _stat_key(filename):
+    if _is_filesystem_file(filename):
+        return None
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class _ContentStore:
+    """
+    Keeps track of the payloads copied into a dataset by content hash.
+
+    Further copies of an identical payload are taken from the first stored
+    one, with dedup="copy" as a copy (a reflink where the filesystem supports
+    it), with dedup="hardlink" as a hard link. Encoded files are copied as raw
+    bytes, they are never decoded.
+    """
+
+    def __init__(self, dedup="copy"):
+        if dedup not in ("copy", "hardlink"):
+            raise Exception(f"unknown dedup mode '{dedup}', use 'copy' or 'hardlink'")
+        self._dedup = dedup
+        self._digests = {}
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def digest(self, file):
+        filename = str(file)
+        key = _stat_key(filename)
+        if key is not None and self._digests.get(filename, (None,))[0] == key:
+            return self._digests[filename][1]
+
+        digest = file_digest(filename)
+        if key is not None:
+            self._digests[filename] = (key, digest)
+        return digest
+
+    def _lookup(self, digest):
+        if digest not in self._files:
+            return None
+        filename, key = self._files[digest]
+
+        # The stored file may have been overwritten or removed in the meantime
+        if key is None or _stat_key(filename) != key:
+            del self._files[digest]
+            return None
+        return filename
+
+    def store(self, src, dst):
+        src, dst = str(src), str(dst)
+        if _same_file(src, dst):
+            # E.g. recreating a dataset into its own directory, the payload is already in place
+            return
+
+        digest = self.digest(src)
+
+        with self._lock:
+            existing = self._lookup(digest)
+        if existing == dst:
+            return
+        if existing is not None and self._dedup == "hardlink":
+            link_file(existing, dst)
+            if profiler.enabled: profiler.count("ContentStore.link")
+        elif existing is not None:
+            copy_file(existing, dst)
+            if profiler.enabled: profiler.count("ContentStore.dedup")
+        else:
+            copy_file(src, dst)
+            if profiler.enabled: profiler.count("ContentStore.copy")
+
+        key = _stat_key(dst)
+        with self._lock:
+            self._files[digest] = (dst, key)
+            if key is not None:
+                self._digests[dst] = (key, digest)
+
+    def unshare(self, file):
+        """ unshare(file):
+        Removes file before it is written if it is hard-linked, so that linked payloads are never modified in place
+        """
+        if self._dedup != "hardlink":
+            return
+        filename = str(file)
+        if _is_filesystem_file(filename):
+            return
+        try:
+            if os.stat(filename).st_nlink > 1:
+                os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        self._digests = {}
+        self._files = {}
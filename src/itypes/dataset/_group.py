@@ -28,17 +28,11 @@ class _Iterator:
 
 
 class _Group(_DatasetNode):
-    def __init__(self, ds, path, label=None):
-        super().__init__(ds, path)
-
-        exists = self._path in self._reg
-        if not exists:
-            group_id = self._path[-1]
-            self._ds.seq._append_group(group_id, label)
-
-        if label is not None:
-            self._reg[self._path + "label"] = label
+    __slots__ = ("_new_item_counter",)
 
+    # Groups are views, they are created and labeled by _Sequence.group()
+    def __init__(self, ds, path):
+        super().__init__(ds, path)
         self._new_item_counter = 0
 
     def __enter__(self):
@@ -71,7 +65,14 @@ class _Group(_DatasetNode):
         if label is None:
             label = id
         path = self._path + "items" + id
-        return _Item(self._ds, path, label, self._ds.seq.new_linear_index())
+        index = self._ds.seq.new_linear_index()
+        if path not in self._reg:
+            self._ds.seq._append_item(self.id(), id, self.label(), label)
+
+        item = _Item(self._ds, path)
+        item._set("label", label)
+        item._set("index", index)
+        return item
 
     def remove(self, id, delete_files=False):
         if delete_files:
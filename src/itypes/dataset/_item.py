@@ -27,22 +27,14 @@ class _Iterator:
 
 
 class _Item(_DatasetNode):
-    def __init__(self, ds, path, label=None, index=None):
+    __slots__ = ("_item_id", "_group_id")
+
+    # Items are views, they are created and labeled by _Group.item()
+    def __init__(self, ds, path):
         super().__init__(ds, path)
 
         self._item_id = self._path[-1]
         self._group_id = self._path[-3]
-        self._group_label = self._reg[self._path + ".." + ".." + "label"]
-
-        exists = self._path in self._reg
-        if not exists:
-            self._ds.seq._append_item(self._group_id, self._item_id, self._group_label, label)
-
-        if label is not None:
-            self._set("label", label)
-
-        if index is not None:
-            self._set("index", index)
 
     def __iter__(self):
         return _Iterator(self)
@@ -60,7 +52,7 @@ class _Item(_DatasetNode):
         return self._group_id
 
     def group_label(self):
-        return self._group_label
+        return self._reg.get(self._path + ".." + ".." + "label", None)
 
     def label(self):
         return self._get("label")
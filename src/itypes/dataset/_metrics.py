@@ -111,7 +111,7 @@ class _Metric(_DatasetNode):
 
             if value_ok and map_ok and not recompute:
                 if log:
-                    logger.info(f"{self.id()} for {item.group_id()}/{item.id()}: {value}")
+                    logger.info(f"{self.id()} for {item.group_id()}/{item.id()}: {value}", key=f"{self.id()} values")
                 errors.append(value)
                 continue
 
@@ -136,7 +136,7 @@ class _Metric(_DatasetNode):
                 map_var[item.group_id(), item.id()].set_data(result.map(dims="hwc"))
 
             if log:
-                logger.info(f"{self.id()} for {item.group_id()}/{item.id()}: {result.error()}")
+                logger.info(f"{self.id()} for {item.group_id()}/{item.id()}: {result.error()}", key=f"{self.id()} values")
 
             errors.append(result.error())
 
@@ -146,6 +146,7 @@ class _Metric(_DatasetNode):
         )
 
         if log:
+            logger.summarize()
             logger.confirm(f"{self.id()} total: {mean_error}")
 
         if save_result:
@@ -11,6 +11,8 @@ from ..json_registry import JsonRegistryNode
 
 
 class _DatasetNode(JsonRegistryNode):
+    __slots__ = ("_ds",)
+
     def __init__(self, ds, path):
         super().__init__(ds._reg, path)
         self._ds = ds
@@ -7,9 +7,11 @@
 ### See https://github.com/eddy-ilg/itypes  ###
 ### --------------------------------------- ###
 
+from collections import OrderedDict
 from ._group import _Group
 from ..json_registry import RegistryPath
 from ..utils import align_tabs
+from ..profiler import profiled
 from ._node import _DatasetNode
 
 
@@ -65,10 +67,19 @@ class _Sequence(_DatasetNode):
     def group(self, id=None, label=None):
         if id is None:
             id = self._new_id()
+        path = self._path + "groups" + id
+
+        # Accessing an existing group does not touch the registry
+        if path in self._reg:
+            if label is not None and self._reg[path + "label"] != label:
+                self._reg[path + "label"] = label
+            return _Group(self._ds, path)
+
         if label is None:
             label = id
-        path = self._path + "groups" + id
-        return _Group(self._ds, path, label)
+        self._append_group(id, label)
+        self._reg[path + "label"] = label
+        return _Group(self._ds, path)
 
     def group_ids(self):
         path = self._path + "groups"
@@ -88,6 +99,8 @@ class _Sequence(_DatasetNode):
         return len(list)
 
     def _append_group(self, group_id, label):
+        # The lists below are modified in place, bypassing the registry checks
+        self._reg._check_writable(self._path)
         path = self._path + "group_list"
         if path not in self._reg:
             self._reg[path] = []
@@ -98,6 +111,7 @@ class _Sequence(_DatasetNode):
         })
 
     def _append_item(self, group_id, item_id, group_label, label):
+        self._reg._check_writable(self._path)
         path = self._path + "item_list"
         index = self._current_new_index()
         if path not in self._reg:
@@ -119,6 +133,70 @@ class _Sequence(_DatasetNode):
             "label": label
         })
 
+    def _bulk_append(self, group_ids, item_ids, group_labels=None, item_labels=None):
+        self._reg._check_writable(self._path)
+        if self._path not in self._reg:
+            self._reg[self._path] = {}
+        seq = self._reg[self._path]
+        group_list = seq.setdefault("group_list", [])
+        groups = seq.setdefault("groups", {})
+        item_list = seq.setdefault("item_list", [])
+
+        # Build the registry structures directly instead of going through _Group and _Item
+        index = len(item_list)
+        for i in range(0, len(group_ids)):
+            group_id, item_id = group_ids[i], item_ids[i]
+
+            group = groups.get(group_id)
+            if group is None:
+                label = group_labels[i] if group_labels is not None else None
+                if label is None: label = group_id
+                group = {"label": label, "item_list": [], "items": {}}
+                groups[group_id] = group
+                group_list.append({
+                    "index": index,
+                    "id": group_id,
+                    "label": label
+                })
+
+            items = group.setdefault("items", {})
+            if item_id in items:
+                continue
+
+            label = item_labels[i] if item_labels is not None else None
+            if label is None: label = item_id
+            items[item_id] = {"label": label, "index": index}
+            group.setdefault("item_list", []).append({
+                "index": index,
+                "id": item_id,
+                "label": label
+            })
+            item_list.append({
+                "index": index,
+                "group_id": group_id,
+                "group_label": group.get("label"),
+                "item_id": item_id,
+                "item_label": label
+            })
+            index += 1
+
+        self._reg.clear_cache()
+
+    def extend(self, records, rel_to="cwd"):
+        columns = OrderedDict()
+        count = 0
+        for record in records:
+            for key, value in record.items():
+                if key not in columns:
+                    columns[key] = [None] * count
+                columns[key].append(value)
+            count += 1
+            for column in columns.values():
+                if len(column) < count:
+                    column.append(None)
+
+        return self._ds.bulk_insert(columns, rel_to=rel_to)
+
     def full_item_list(self):
         return self._get("item_list", [])
 
@@ -131,6 +209,7 @@ class _Sequence(_DatasetNode):
     def group_list(self):
         return self._get("group_list", [])
 
+    @profiled("Sequence.rebuild_linear_index")
     def rebuild_linear_index(self):
         item_list_path  = self._path + "item_list"
         self._reg[item_list_path] = []
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+import os
+import json
+import numpy as np
+from multiprocessing import shared_memory
+from ..filesystem import File
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before python 3.13 attaching registers the block with the resource
+        # tracker, which multiprocessing workers share with their parent
+        return shared_memory.SharedMemory(name=name)
+
+
+class _SharedValue:
+    __slots__ = ("_index", "_pos", "_var")
+
+    def __init__(self, index, pos, var):
+        self._index = index
+        self._pos = pos
+        self._var = var
+
+    def file(self):
+        return self._index.file(self._pos, self._var)
+
+    def data(self, **kwargs):
+        return self._index.data(self._pos, self._var, **kwargs)
+
+
+class _SharedItem:
+    __slots__ = ("_index", "_pos")
+
+    def __init__(self, index, pos):
+        self._index = index
+        self._pos = pos
+
+    def id(self):
+        return self._index.item_id(self._pos)
+
+    def group_id(self):
+        return self._index.group_id(self._pos)
+
+    def __getitem__(self, var):
+        return _SharedValue(self._index, self._pos, var)
+
+
+class SharedIndex:
+    """
+    Flat, immutable copy of the read side of a dataset (item ids and the
+    values of its variables) in a single shared memory block.
+
+    Items are stored as one utf-8 blob with an int64 offset table, so worker
+    processes can attach to it (e.g. by pickling the index) without touching
+    per-item python objects. Use index[i][var].file() like ds[i][var].file().
+    """
+
+    def __init__(self, name, columns, scalar, length):
+        self._shm = _attach(name)
+        self._owner = False
+        self._init(columns, scalar, length)
+
+    def _init(self, columns, scalar, length):
+        self._columns = columns
+        self._column_index = {column: i for i, column in enumerate(columns)}
+        self._scalar = scalar
+        self._length = length
+        self._offsets = np.ndarray((len(columns), length + 1), dtype=np.int64, buffer=self._shm.buf)
+        self._data_start = self._offsets.nbytes
+
+    @staticmethod
+    def create(columns, scalar=None):
+        """ create(columns, scalar):
+        columns is a dict of equally long string lists, scalar the set of
+        columns holding json encoded values.
+        """
+        names = list(columns.keys())
+        length = len(columns[names[0]]) if len(names) else 0
+
+        offsets = np.zeros((len(names), length + 1), dtype=np.int64)
+        blobs = []
+        pos = 0
+        for i, name in enumerate(names):
+            values = columns[name]
+            if len(values) != length:
+                raise Exception(f"column {name} has {len(values)} entries, expected {length}")
+            blob = [value.encode() for value in values]
+            offsets[i, 1:] = np.cumsum([len(value) for value in blob], dtype=np.int64) + pos
+            offsets[i, 0] = pos
+            pos = int(offsets[i, -1])
+            blobs.append(b''.join(blob))
+
+        size = max(offsets.nbytes + pos, 1)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:offsets.nbytes] = offsets.tobytes()
+        start = offsets.nbytes
+        for blob in blobs:
+            shm.buf[start:start + len(blob)] = blob
+            start += len(blob)
+
+        index = SharedIndex.__new__(SharedIndex)
+        index._shm = shm
+        index._owner = True
+        index._init(names, set(scalar) if scalar is not None else set(), length)
+        return index
+
+    @staticmethod
+    def from_dataset(ds, variables=None):
+        if variables is None:
+            variables = ds.var.ids()
+
+        items = ds.seq.full_item_list()
+        base = ds.base_path()
+        base = base.abs() if base is not None else None
+
+        columns = {
+            "group_id": [item["group_id"] for item in items],
+            "item_id": [item["item_id"] for item in items],
+        }
+        scalar = set()
+        for var in variables:
+            variable = ds.var[var]
+            values = ds._reg.get(variable._path + "values", {})
+            column = []
+            if variable.is_scalar():
+                scalar.add(var)
+                for item in items:
+                    value = values.get(item["group_id"], {}).get(item["item_id"], {})
+                    column.append(json.dumps(value.get("value", None)))
+            else:
+                for item in items:
+                    value = values.get(item["group_id"], {}).get(item["item_id"], {})
+                    path = value.get("path", None)
+                    if path is None:
+                        column.append("")
+                    elif base is not None:
+                        column.append(os.path.normpath(os.path.join(str(base), path)))
+                    else:
+                        column.append(path)
+            columns[var] = column
+
+        return SharedIndex.create(columns, scalar)
+
+    def name(self):
+        return self._shm.name
+
+    def __len__(self):
+        return self._length
+
+    def variable_ids(self):
+        return [column for column in self._columns if column not in ("group_id", "item_id")]
+
+    def nbytes(self):
+        return self._shm.size
+
+    def entry(self, pos, column):
+        if pos < 0:
+            pos += self._length
+        if pos < 0 or pos >= self._length:
+            raise IndexError(pos)
+        offsets = self._offsets[self._column_index[column]]
+        start = self._data_start + int(offsets[pos])
+        end = self._data_start + int(offsets[pos + 1])
+        return bytes(self._shm.buf[start:end]).decode()
+
+    def group_id(self, pos):
+        return self.entry(pos, "group_id")
+
+    def item_id(self, pos):
+        return self.entry(pos, "item_id")
+
+    def file(self, pos, var):
+        if var in self._scalar:
+            return None
+        path = self.entry(pos, var)
+        if path == "":
+            return None
+        return File(path)
+
+    def value(self, pos, var):
+        if var not in self._scalar:
+            return None
+        return json.loads(self.entry(pos, var))
+
+    def data(self, pos, var, **kwargs):
+        if var in self._scalar:
+            return self.value(pos, var)
+        file = self.file(pos, var)
+        if file is None:
+            return None
+        return file.read(**kwargs)
+
+    def __getitem__(self, pos):
+        return _SharedItem(self, pos)
+
+    def __iter__(self):
+        for pos in range(0, self._length):
+            yield _SharedItem(self, pos)
+
+    def __getstate__(self):
+        # Only the block name travels to worker processes
+        return {
+            "name": self._shm.name,
+            "columns": self._columns,
+            "scalar": self._scalar,
+            "length": self._length
+        }
+
+    def __setstate__(self, state):
+        self._shm = _attach(state["name"])
+        self._owner = False
+        self._init(state["columns"], state["scalar"], state["length"])
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._offsets = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
@@ -10,9 +10,44 @@
 from itypes import Path
 from ..filesystem import File
 from ._node import _DatasetNode
+from multiprocessing.dummy import Pool as ThreadPool
+
+
+def _copy_values(pairs, mode="ref", num_threads=1):
+    if mode == "ref" or num_threads <= 1:
+        for value, other in pairs:
+            value.copy_from(other, mode=mode)
+        return
+
+    # Registry updates are done serially, only the file copies run in parallel
+    jobs = []
+    for value, other in pairs:
+        if value._can_copy_file(other):
+            file = other.file().abs()
+            out_file, abs_file = value._output_file(file.extension())
+            jobs.append((value, file, out_file, abs_file))
+        else:
+            value.copy_from(other, mode=mode)
+
+    def _copy(job):
+        value, file, out_file, abs_file = job
+        value._copy_file(file, abs_file)
+
+    pool = ThreadPool(num_threads)
+    pool.map(_copy, jobs)
+    pool.close()
+
+    for value, file, out_file, abs_file in jobs:
+        value._set_path(out_file, abs_file)
+
+    if len(jobs):
+        jobs[0][0]._ds._do_auto_write()
+
 
 
 class _Value(_DatasetNode):
+    __slots__ = ()
+
     def variable_id(self):
         path = self._path + ".." + ".." + ".."
         return str(path[-1])
@@ -31,8 +66,22 @@ class _Value(_DatasetNode):
         return str(self._path[-1])
 
     def copy_from(self, other, mode="ref"):
-        if mode == "ref": self.set_ref(other.file())
-        else:             self.set_data(other.data())
+        if mode == "ref":
+            self.set_ref(other.file())
+        elif self._can_copy_file(other):
+            self.set_file(other.file())
+        else:
+            self.set_data(other.data())
+
+    def _can_copy_file(self, other):
+        if self.is_scalar() or other.is_scalar():
+            return False
+        if self.type() != other.type():
+            return False
+        file = other.file()
+        if file is None:
+            return False
+        return file.extension() == self.variable().extension()
 
     def set_ref(self, file, rel_to="cwd", check_if_exists=False):
         if file is None:
@@ -66,7 +115,6 @@ class _Value(_DatasetNode):
             return
 
         variable = self.variable()
-        item = self._ds.seq[self.group_id()][self.item_id()]
 
         if variable.is_scalar():
             self._reg[self._path + "value"] = data
@@ -74,26 +122,53 @@ class _Value(_DatasetNode):
             if extension is None:
                 extension = variable.extension()
 
-            if self._ds._structured:
-                file = Path(self.group_id()).cd(self.item_id()).file(f"{self.variable_id()}.{extension}")
-            else:
-                linear_format = self._ds._linear_format
-                linear_index = item.linear_index()
-                if "{var}" not in linear_format:
-                    raise Exception("linear_format needs to contain '{var}'")
-                if '%' in linear_format: indexed = linear_format % linear_index
-                else:                    indexed = linear_format
-                filename = indexed.replace("{var}", self.variable_id()) + '.' + extension
-                file = File(filename)
-
-            abs_file = (self._ds.base_path() + file.path()).abs().file(file.name())
+            file, abs_file = self._output_file(extension)
+            self._ds._content_store.unshare(abs_file)
             variable.write(abs_file, data, **kwargs)
-            self._reg[self._path + "path"] = str(file) if not self._ds._abs_paths else str(abs_file)
+            self._set_path(file, abs_file)
+
+        self._ds._do_auto_write()
+
+        return self
+
+    def set_file(self, file):
+        if file is None:
+            self._reg.remove(self._path + "path")
+            return
+
+        file = File(file).abs()
+        out_file, abs_file = self._output_file(file.extension())
+        self._copy_file(file, abs_file)
+        self._set_path(out_file, abs_file)
 
         self._ds._do_auto_write()
 
         return self
 
+    def _copy_file(self, file, abs_file):
+        abs_file.path().mkdir()
+        self._ds._content_store.store(file, abs_file)
+
+    def _set_path(self, file, abs_file):
+        self._reg[self._path + "path"] = str(file) if not self._ds._abs_paths else str(abs_file)
+
+    def _output_file(self, extension):
+        if self._ds._structured:
+            file = Path(self.group_id()).cd(self.item_id()).file(f"{self.variable_id()}.{extension}")
+        else:
+            item = self._ds.seq[self.group_id()][self.item_id()]
+            linear_format = self._ds._linear_format
+            linear_index = item.linear_index()
+            if "{var}" not in linear_format:
+                raise Exception("linear_format needs to contain '{var}'")
+            if '%' in linear_format: indexed = linear_format % linear_index
+            else:                    indexed = linear_format
+            filename = indexed.replace("{var}", self.variable_id()) + '.' + extension
+            file = File(filename)
+
+        abs_file = (self._ds.base_path() + file.path()).abs().file(file.name())
+        return file, abs_file
+
     def is_scalar(self):
         return self.variable().is_scalar()
 
@@ -103,8 +178,8 @@ class _Value(_DatasetNode):
         file = File(self._reg[self._path + "path"])
         path = self._ds.base_path()
         if path is not None:
-            path = path.cd(file.path()).abs()
-            return path.file(file.name())
+            # The absolute base path is cached, the result only needs normalizing
+            return File(file.name(), path.abs().cd(file.path()).abs())
         return file
 
     def delete_file(self):
@@ -85,11 +85,11 @@ class _Variables(_DatasetNode):
         var = self.create(var.type(), var.id())
         var.copy_from(var, indexing="linear", mode="ref")
 
-    def copy_from(self, other, indexing="linear", mode="ref", include_data=True):
+    def copy_from(self, other, indexing="linear", mode="ref", include_data=True, num_threads=1):
         for other_var in other:
             var = self.create(other_var.type(), other_var.id())
             if include_data:
-                var.copy_from(other_var, indexing=indexing, mode=mode)
+                var.copy_from(other_var, indexing=indexing, mode=mode, num_threads=num_threads)
 
     def verify(self, log=True):
         succeeded = True
@@ -104,18 +104,21 @@ class _Variables(_DatasetNode):
                 elif iid not in self._ds.seq[gid]:
                     found = False
                 if not found and log:
-                    logger.warning(f"Value for variable discovered {var.id()} for non-existent item {iid}/{gid}")
+                    logger.warning(f"Value for variable discovered {var.id()} for non-existent item {iid}/{gid}", key="orphaned values")
 
                 if not value.is_scalar():
                     if not value.file().exists():
                         if log:
-                            logger.error(f"File {value.file()} for item {iid}/{gid} variable {var.id()} does not exist")
+                            logger.error(f"File {value.file()} for item {iid}/{gid} variable {var.id()} does not exist", key="missing files")
                         succeeded = False
 
             for item in self._ds:
                 gid, iid = item.group_id(), item.id()
                 if ((gid, iid) not in var) and log:
-                    logger.warning(f"Item {iid}/{gid} missing value for variale {var.id()}")
+                    logger.warning(f"Item {iid}/{gid} missing value for variale {var.id()}", key="missing values")
+
+            if log:
+                logger.summarize()
 
         return succeeded
 
@@ -147,13 +150,13 @@ class _Variables(_DatasetNode):
 
                 if not found:
                     if log:
-                        logger.warning(f"Removing value for variable {var.id()} for non-existent item {iid}/{gid}")
+                        logger.warning(f"Removing value for variable {var.id()} for non-existent item {iid}/{gid}", key="orphaned values")
                     remove_keys.append((gid, iid))
 
                 if not value.is_scalar():
                     if not value.file().exists():
                         if log:
-                            logger.warning(f"File {value.file()} for item {iid}/{gid} variable {var.id()} does not exist")
+                            logger.warning(f"File {value.file()} for item {iid}/{gid} variable {var.id()} does not exist", key="missing files")
 
             for key in remove_keys:
                 del var[key]
@@ -161,6 +164,9 @@ class _Variables(_DatasetNode):
             for item in self._ds:
                 gid, iid = item.group_id(), item.id()
                 if ((gid, iid) not in var) and log:
-                    logger.warning(f"Item {iid}/{gid} missing value for variale {var.id()}")
+                    logger.warning(f"Item {iid}/{gid} missing value for variale {var.id()}", key="missing values")
+
+            if log:
+                logger.summarize()
 
         return True
\ No newline at end of file
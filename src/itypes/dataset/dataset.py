@@ -8,13 +8,25 @@
 ### --------------------------------------- ###
 
 import os
+from collections import OrderedDict
 from ._sequence import _Sequence
 from ._variables import _Variables
 from ._metrics import _Metrics
 from ._visualizations import _Visualizations
+from ._content_store import _ContentStore
+from ._shared_index import SharedIndex
+from ._value import _copy_values
 from ..json_registry import JsonRegistry, RegistryPath
 from ..filesystem import File, Path
+from ..filesystem.io import sync
 from ..utils import align_tabs
+from ..profiler import profiled
+
+
+def _column(data):
+    if hasattr(data, 'tolist'):
+        return data.tolist()
+    return list(data)
 
 
 class _Iterator:
@@ -42,9 +54,12 @@ class Dataset:
                  auto_write=False,
                  structured=True,
                  single_item=False,
-                 linear_format="%08d-{var}"):
+                 linear_format="%08d-{var}",
+                 readonly=False,
+                 dedup="copy"):
 
-        self._reg = JsonRegistry(file)
+        self._reg = JsonRegistry(file, readonly=readonly)
+        self._readonly = readonly
         self._abs_paths = abs_paths
         self._auto_write = auto_write
         self._structured = structured
@@ -54,20 +69,26 @@ class Dataset:
         self.var = _Variables(self)
         self.seq = _Sequence(self)
         self.met = _Metrics(self)
+        self._content_store = _ContentStore(dedup)
         self._file = self._make_file(file) if file is not None else None
 
         self._single_item = single_item
+        self._single_item_value = None
         if single_item:
             self._structured = False
             self._linear_format = "{var}"
-            self._single_item_value = self.seq.group().item()
+            if not readonly:
+                self._single_item_value = self.seq.group().item()
 
         self._merge_index = [0, 0]
 
     def _do_auto_write(self):
-        if self._auto_write:
+        if self._auto_write and not self._readonly:
             self.write()
 
+    def readonly(self):
+        return self._readonly
+
     def file(self):
         return self._file
 
@@ -92,11 +113,15 @@ class Dataset:
             file = Path(str(org_file)).file("data.json")
         return file
 
+    @profiled("Dataset.write")
     def write(self, file=None):
+        if self._readonly:
+            raise Exception("cannot write read-only dataset")
         if file is None:
             file = self._file
         file = self._make_file(file)
         self._reg.write(file)
+        sync(file.abs().str())
         self._file = file
         return self
 
@@ -115,8 +140,17 @@ class Dataset:
 
         self._reg.read(file)
         self._file = file
+        if self._single_item and self._readonly:
+            self._single_item_value = self[0]
         return self
 
+    def export_shared(self, variables=None):
+        """ export_shared(variables=None):
+        Returns a SharedIndex with the item ids and the values of the given variables
+        (all by default). Close it when done, workers attach to it when it is pickled.
+        """
+        return SharedIndex.from_dataset(self, variables)
+
     def __len__(self):
         return len(self.seq.full_item_list())
 
@@ -166,7 +200,40 @@ class Dataset:
             str += self.seq._str(prefix=prefix + indent, indent=indent)
         return str
 
-    def merge(self, other, mode="ref", include_label=False):
+    def bulk_insert(self, data, rel_to="cwd"):
+        columns = OrderedDict((key, _column(data[key])) for key in data.keys())
+        if "group_id" not in columns:
+            raise Exception("bulk_insert() needs a group_id column")
+
+        group_ids = [str(id) for id in columns.pop("group_id")]
+        group_labels = columns.pop("group_label", None)
+        item_labels = columns.pop("item_label", None)
+
+        if "item_id" in columns:
+            item_ids = [str(id) for id in columns.pop("item_id")]
+        else:
+            counters = {}
+            item_ids = []
+            for group_id in group_ids:
+                if group_id not in counters:
+                    counters[group_id] = len(self.seq[group_id].item_ids()) if group_id in self.seq else 0
+                item_ids.append("%08d" % counters[group_id])
+                counters[group_id] += 1
+
+        for var_id, values in columns.items():
+            if var_id not in self.var:
+                raise Exception(f"\"{var_id}\" is not an existing variable")
+            if len(values) != len(group_ids):
+                raise Exception(f"bulk_insert() column \"{var_id}\" has {len(values)} entries, expected {len(group_ids)}")
+
+        self.seq._bulk_append(group_ids, item_ids, group_labels, item_labels)
+        for var_id, values in columns.items():
+            self.var[var_id]._bulk_set(group_ids, item_ids, values, rel_to=rel_to)
+
+        self._do_auto_write()
+        return self
+
+    def merge(self, other, mode="ref", include_label=False, num_threads=1):
         other_dims = other.viz.dimensions()
         col, row = self._merge_index
 
@@ -193,7 +260,7 @@ class Dataset:
 
             var_mapping[var.id()] = new_id
             self.var.create(type=var.type(), id=new_id)
-            self.var[new_id].copy_from(var, mode=mode)
+            self.var[new_id].copy_from(var, mode=mode, num_threads=num_threads)
 
         # Copy visualizaitons
         for viz in other.viz:
@@ -219,10 +286,10 @@ class Dataset:
         dims = self.viz.dimensions()
         self._merge_index = [0, dims.max_row + 1]
 
-    def copy_from(self, other, mode="ref"):
+    def copy_from(self, other, mode="ref", num_threads=1):
         self.viz.copy_from(other.viz)
         self.seq.copy_from(other.seq)
-        self.var.copy_from(other.var, mode=mode)
+        self.var.copy_from(other.var, mode=mode, num_threads=num_threads)
         self.met.copy_from(other.met)
 
     def template_from(self, other, include_metrics=True):
@@ -250,7 +317,8 @@ class Dataset:
             return False
         return True
 
-    def concat(self, other, mode="ref"):
+    def concat(self, other, mode="ref", num_threads=1):
+        pairs = []
         for other_group in other.seq:
             group = self.seq.group(self.seq.new_group_id(other_group.id()), other_group.label())
             for other_item in other_group:
@@ -259,5 +327,7 @@ class Dataset:
                     var_id = other_value.variable_id()
                     if var_id not in self.var:
                         continue
-                    item[var_id].copy_from(other_value, mode=mode)
+                    pairs.append((item[var_id], other_value))
+
+        _copy_values(pairs, mode=mode, num_threads=num_threads)
 
@@ -12,6 +12,8 @@ from ._variable import _Variable
 
 
 class _FileVariable(_Variable):
+    __slots__ = ()
+
     def extension(self):
         raise NotImplementedError
 
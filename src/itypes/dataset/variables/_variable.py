@@ -7,12 +7,30 @@
 ### See https://github.com/eddy-ilg/itypes  ###
 ### --------------------------------------- ###
 
+import os
 from ...filesystem import File
-from .._value import _Value
+from ...filesystem.path import abspath
+from .._value import _Value, _copy_values
 from ...utils import align_tabs
 from .._node import _DatasetNode
 
 
+def _ref_path(filename, rel_to, base, abs_paths):
+    filename = str(filename)
+    if rel_to == "cwd":
+        filename = abspath(filename)
+    elif rel_to == "output":
+        filename = abspath(os.path.join(base, filename))
+    else:
+        raise Exception("rel_to must be 'cwd' or 'output'")
+
+    if abs_paths:
+        return filename
+    if filename.startswith(base + '/'):
+        return filename[len(base) + 1:]
+    return os.path.relpath(filename, base)
+
+
 class _Iterator:
     def __init__(self, var):
         self._var = var
@@ -43,6 +61,8 @@ class _Iterator:
 
 
 class _Variable(_DatasetNode):
+    __slots__ = ()
+
     def __getitem__(self, index):
         group_id, item_id = index
 
@@ -96,24 +116,49 @@ class _Variable(_DatasetNode):
     def __str__(self):
         return self.str()
 
-    def copy_from(self, other, indexing="linear", mode=""):
+    def copy_from(self, other, indexing="linear", mode="", num_threads=1):
+        pairs = []
         if indexing == "linear":
             for i in range(0, len(self._ds)):
                 item = self._ds[i]
                 group_id = item.group_id()
                 item_id = item.id()
                 if i < len(other._ds):
-                    self[group_id, item_id].copy_from(other._ds[i][other.id()], mode=mode)
+                    pairs.append((self[group_id, item_id], other._ds[i][other.id()]))
         elif indexing == "id":
             for group in self._ds.seq:
                 for item in group:
                     group_id = item.group_id()
                     item_id = item.id()
                     if (group_id, item_id) in other:
-                        self[group_id, item_id].copy_from(other[group_id, item_id], mode=mode)
+                        pairs.append((self[group_id, item_id], other[group_id, item_id]))
         else:
             raise Exception(f"invalid value for indexing= parameter: {indexing}")
 
+        _copy_values(pairs, mode=mode, num_threads=num_threads)
+
+    def _bulk_set(self, group_ids, item_ids, values, rel_to="cwd"):
+        self._reg._check_writable(self._path)
+        path = self._path + "values"
+        if path not in self._reg:
+            self._reg[path] = {}
+        groups = self._reg[path]
+
+        scalar = self.is_scalar()
+        base = None
+        if not scalar:
+            base = self._ds.base_path().abs().str()
+        abs_paths = self._ds._abs_paths
+
+        for group_id, item_id, value in zip(group_ids, item_ids, values):
+            if value is None:
+                continue
+            if scalar: entry = {"value": value}
+            else:      entry = {"path": _ref_path(value, rel_to, base, abs_paths)}
+            groups.setdefault(group_id, {})[item_id] = entry
+
+        self._reg.clear_cache()
+
     def group_ids(self):
         path = self._path + "values"
         if path not in self._reg:
@@ -11,6 +11,8 @@ from ._file_variable import _FileVariable
 from .registry import register_variable
 
 class _FloatVariable(_FileVariable):
+    __slots__ = ()
+
     def extension(self): return "npz"
 
 register_variable("float", _FloatVariable)
\ No newline at end of file
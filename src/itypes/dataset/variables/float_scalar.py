@@ -11,6 +11,6 @@ from ._variable import _Variable
 from .registry import register_variable
 
 class _FloatScalarVariable(_Variable):
-    pass
+    __slots__ = ()
 
 register_variable("float-scalar", _FloatScalarVariable)
\ No newline at end of file
@@ -12,6 +12,8 @@ from .registry import register_variable
 
 
 class _FlowVariable(_FileVariable):
+    __slots__ = ()
+
     def extension(self): return "flo"
 
 register_variable("flow", _FlowVariable)
\ No newline at end of file
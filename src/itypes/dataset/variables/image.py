@@ -12,6 +12,8 @@ from .registry import register_variable
 
 
 class _ImageVariable(_FileVariable):
+    __slots__ = ()
+
     def extension(self): return "png"
 
 register_variable("image", _ImageVariable)
\ No newline at end of file
@@ -11,6 +11,8 @@ from ._file_variable import _FileVariable
 from .registry import register_variable
 
 class _PropertiesVariable(_FileVariable):
+    __slots__ = ()
+
     def extension(self): return "json"
 
 register_variable("props", _PropertiesVariable)
\ No newline at end of file
@@ -11,6 +11,8 @@ from ._file_variable import _FileVariable
 from .registry import register_variable
 
 class _TextVariable(_FileVariable):
+    __slots__ = ()
+
     def extension(self): return "html"
 
 register_variable("text", _TextVariable)
\ No newline at end of file
@@ -21,4 +21,6 @@ from .file import File
 from .path import Path
 from .path import home
 
-from .memory import MemoryFileSystem
\ No newline at end of file
+from .memory import MemoryFileSystem
+from .caching import CachingFileSystem
+from .archive import ArchiveFileSystem
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+import io
+import os
+import stat
+import zlib
+import errno
+import calendar
+import struct
+import tarfile
+import zipfile
+import tempfile
+import threading
+import numpy as np
+from .path import Path
+
+
+_STORED = 0
+_DEFLATED = 8
+_INDEX_VERSION = 1
+
+
+def _member_name(name):
+    name = os.path.normpath(name.lstrip('/'))
+    return '' if name == '.' else name
+
+
+def _read_only(path):
+    return OSError(errno.EROFS, "read-only archive file system", str(path))
+
+
+def _tar_members(filename):
+    # Members of compressed tars can't be read at an offset
+    with tarfile.open(filename, "r:") as tar:
+        for member in tar:
+            if member.isreg():
+                yield member.name, member.offset_data, member.size, member.size, _STORED, member.mtime
+
+
+def _zip_members(filename):
+    with zipfile.ZipFile(filename) as archive, open(filename, "rb") as f:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if info.compress_type not in (_STORED, _DEFLATED):
+                raise Exception(f"{filename}: member {info.filename} uses an unsupported compression")
+            # The data follows the local header, whose extra field can differ from the central directory
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_length, extra_length = struct.unpack("<2H", header[26:30])
+            offset = info.header_offset + 30 + name_length + extra_length
+            mtime = calendar.timegm(info.date_time + (0, 0, -1)) if info.date_time[0] >= 1980 else 0
+            yield info.filename, offset, info.compress_size, info.file_size, info.compress_type, mtime
+
+
+def _build_index(filename):
+    members = _zip_members(filename) if zipfile.is_zipfile(filename) else _tar_members(filename)
+    names = []
+    columns = []
+    for name, offset, stored_size, size, method, mtime in members:
+        names.append(_member_name(name).encode())
+        columns.append((offset, stored_size, size, method, mtime))
+
+    columns = np.array(columns, dtype=np.int64).reshape(-1, 5)
+    name_offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    name_offsets[1:] = np.cumsum([len(name) for name in names], dtype=np.int64)
+    return {
+        "names": np.frombuffer(b''.join(names), dtype=np.uint8),
+        "name_offsets": name_offsets,
+        "columns": columns,
+    }
+
+
+def _index_key(filename):
+    st = os.stat(filename)
+    return np.array([_INDEX_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _load_index(filename, sidecar):
+    """ _load_index(filename, sidecar):
+    Returns the member index of an archive, read from the sidecar file if it belongs to the current archive
+    """
+    key = _index_key(filename)
+    try:
+        with np.load(sidecar, allow_pickle=False) as data:
+            if np.array_equal(data["key"], key):
+                return {name: data[name] for name in ("names", "name_offsets", "columns")}
+    except (OSError, KeyError, ValueError):
+        pass
+
+    index = _build_index(filename)
+    try:
+        fd, tmp = tempfile.mkstemp(prefix=".itypes-", dir=os.path.dirname(os.path.abspath(sidecar)))
+    except OSError:
+        # The index is rebuilt next time if it can't be stored next to the archive
+        return index
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, key=key, **index)
+        os.replace(tmp, sidecar)
+    except OSError:
+        pass
+    finally:
+        # Only left if the index could not be stored
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return index
+
+
+class ArchiveFileSystem:
+    """
+    Read-only filesystem over the members of uncompressed tar files (e.g.
+    WebDataset shards) or zip files. Once mounted, the members appear below
+    the mountpoint, which is the archive itself by default, so that e.g.
+    Dataset('archive.tar/data.json').read() works on the archive.
+
+    The offsets of the members are indexed once and stored in a sidecar
+    file next to each archive (archive + '.index.npz'). Reads are a single
+    pread() at the member offset and can run from several threads.
+    """
+
+    def __init__(self, archives, mountpoint=None, sidecar=True):
+        if isinstance(archives, (str, os.PathLike)):
+            archives = [archives]
+        archives = [os.path.abspath(str(archive)) for archive in archives]
+        if mountpoint is None:
+            if len(archives) != 1:
+                raise Exception("ArchiveFileSystem needs a mountpoint for more than one archive")
+            mountpoint = archives[0]
+
+        self._archives = archives
+        self._lock = threading.Lock()
+        self._dirs = None
+        self._fds = []
+        self._members = {}
+        columns = []
+        count = 0
+        for shard, archive in enumerate(archives):
+            index = _load_index(archive, archive + ".index.npz") if sidecar else _build_index(archive)
+            names = index["names"].tobytes()
+            name_offsets = index["name_offsets"]
+            bounds = name_offsets.tolist()
+            # Members of later shards replace those of earlier ones with the same name
+            self._members.update(zip(
+                (names[start:end].decode() for start, end in zip(bounds[:-1], bounds[1:])),
+                range(count, count + len(bounds) - 1)
+            ))
+            count += len(bounds) - 1
+            shard_column = np.full((len(index["columns"]), 1), shard, dtype=np.int64)
+            columns.append(np.concatenate((shard_column, index["columns"]), axis=1))
+            self._fds.append(os.open(archive, os.O_RDONLY))
+        self._columns = np.concatenate(columns) if len(columns) else np.zeros((0, 6), dtype=np.int64)
+        self._mtime = max(os.stat(archive).st_mtime for archive in archives)
+
+        self._mountpoint = None
+        self.mount(mountpoint)
+
+    def close(self):
+        self.unmount()
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = []
+
+    def __del__(self):
+        for fd in getattr(self, "_fds", []):
+            os.close(fd)
+
+    def __len__(self):
+        return len(self._members)
+
+    #
+    # ----------- Mounting -----------
+    #
+    def mount(self, mountpoint):
+        self.unmount()
+        mountpoint = os.path.abspath(str(mountpoint))
+        self._mountpoint = mountpoint
+        self._prefix = mountpoint if mountpoint.endswith('/') else mountpoint + '/'
+        self._register()
+        return self
+
+    def unmount(self):
+        if self._mountpoint is not None:
+            self._unregister()
+        self._mountpoint = None
+        return self
+
+    def mountpoint(self):
+        return self._mountpoint
+
+    def includes(self, path):
+        path = str(path)
+        return path == self._mountpoint or path.startswith(self._prefix)
+
+    def _register(self):
+        from .io import register_file_system
+        register_file_system(self)
+        return self
+
+    def _unregister(self):
+        from .io import unregister_file_system
+        unregister_file_system(self)
+        return self
+
+    #
+    # ----------- Lookup -----------
+    #
+    def _name(self, path):
+        path = str(path)
+        if path == self._mountpoint:
+            return ''
+        if not path.startswith(self._prefix):
+            raise KeyError(path)
+        return _member_name(path[len(self._prefix):])
+
+    def _directories(self):
+        # Directories are implied by the member names and only built when listing
+        with self._lock:
+            if self._dirs is None:
+                dirs = {'': ([], set())}
+                for name in self._members.keys():
+                    dir, _, base = name.rpartition('/')
+                    entry = dirs.get(dir)
+                    if entry is None:
+                        entry = ([], set())
+                        dirs[dir] = entry
+                        child = dir
+                        while child != '':
+                            parent, _, child_name = child.rpartition('/')
+                            parent_entry = dirs.get(parent)
+                            if parent_entry is None:
+                                parent_entry = ([], set())
+                                dirs[parent] = parent_entry
+                            parent_entry[1].add(child_name)
+                            child = parent
+                    entry[0].append(base)
+                self._dirs = dirs
+            return self._dirs
+
+    def _member(self, path):
+        name = self._name(path)
+        idx = self._members.get(name)
+        if idx is None:
+            if name in self._directories():
+                raise IsADirectoryError(str(path))
+            raise FileNotFoundError(str(path))
+        return self._columns[idx].tolist()
+
+    def _read(self, path):
+        shard, offset, stored_size, size, method, mtime = self._member(path)
+        fd = self._fds[shard]
+        data = os.pread(fd, stored_size, offset)
+        if len(data) < stored_size:
+            # pread() may return less than requested, e.g. for members above 2GB
+            chunks = [data]
+            pos = len(data)
+            while pos < stored_size:
+                chunk = os.pread(fd, stored_size - pos, offset + pos)
+                if not chunk:
+                    raise EOFError(str(path))
+                chunks.append(chunk)
+                pos += len(chunk)
+            data = b''.join(chunks)
+        if method == _DEFLATED:
+            data = zlib.decompress(data, -15)
+        return data
+
+    #
+    # ----------- Access -----------
+    #
+    def __getitem__(self, file):
+        return self._read(file)
+
+    def __contains__(self, file):
+        if not self.includes(file):
+            return False
+        return self.exists(file)
+
+    def __setitem__(self, file, data):
+        raise _read_only(file)
+
+    def open(self, file, mode):
+        if 'r' not in mode or '+' in mode:
+            raise _read_only(file)
+        data = self._read(file)
+        if 'b' in mode:
+            return io.BytesIO(data)
+        return io.StringIO(data.decode())
+
+    def buffer(self, file):
+        return memoryview(self._read(file))
+
+    def read(self, file):
+        return self[file]
+
+    def exists(self, path):
+        name = self._name(path)
+        return name in self._members or name in self._directories()
+
+    def is_dir(self, path):
+        if not self.includes(path):
+            return False
+        return self._name(path) in self._directories()
+
+    def mkdir(self, path):
+        if not self.is_dir(path):
+            raise _read_only(path)
+
+    def sync(self):
+        return self
+
+    def remove(self, path):
+        raise _read_only(path)
+
+    def scandir(self, path):
+        """ scandir(path):
+        Returns the names of the files and of the directories in path
+        """
+        entry = self._directories().get(self._name(path))
+        if entry is None:
+            raise FileNotFoundError(str(path))
+        return list(entry[0]), list(entry[1])
+
+    def stat(self, path):
+        name = self._name(path)
+        idx = self._members.get(name)
+        if idx is None:
+            if name not in self._directories():
+                raise FileNotFoundError(str(path))
+            mode, size, mtime = stat.S_IFDIR | 0o555, 0, self._mtime
+        else:
+            mode, size, mtime = stat.S_IFREG | 0o444, int(self._columns[idx][3]), int(self._columns[idx][5])
+        return os.stat_result((mode, 0, 0, 1, 0, 0, size, mtime, mtime, mtime))
+
+    def list_dirs(self, path=None):
+        path = Path(path if path is not None else self._mountpoint)
+        files, dirs = self.scandir(path)
+        return [path.cd(name) for name in sorted(dirs)]
+
+    def list_files(self, path=None):
+        path = Path(path if path is not None else self._mountpoint)
+        files, dirs = self.scandir(path)
+        return [path.file(name) for name in sorted(files)]
+
+    def __str__(self):
+        return f"ArchiveFileSystem({', '.join(self._archives)} at {self._mountpoint}, {len(self._members)} members)"
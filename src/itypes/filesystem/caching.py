@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+import io
+import os
+import time
+import shutil
+import atexit
+import tempfile
+import threading
+from collections import OrderedDict
+from .path import Path
+
+
+class _BytesWriter(io.BytesIO):
+    def __init__(self, fs, path):
+        super().__init__()
+        self._fs = fs
+        self._path = path
+
+    def close(self):
+        if not self.closed:
+            self._fs[self._path] = self.getvalue()
+        super().close()
+
+
+class _TextWriter(io.StringIO):
+    def __init__(self, fs, path):
+        super().__init__()
+        self._fs = fs
+        self._path = path
+
+    def close(self):
+        if not self.closed:
+            self._fs[self._path] = self.getvalue()
+        super().close()
+
+
+def _write_temp_file(filename, data):
+    # Written next to filename, so that os.replace() can move it there and readers
+    # either see the old or the new file, never a partial one
+    fd, tmp = tempfile.mkstemp(prefix=".itypes-", dir=os.path.dirname(filename))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp
+
+
+def _remove(filename):
+    if os.path.isdir(filename) and not os.path.islink(filename):
+        shutil.rmtree(filename)
+        return True
+    if os.path.lexists(filename):
+        os.remove(filename)
+        return True
+    return False
+
+
+def _fsync(filename):
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CachingFileSystem:
+    """
+    Write-back cache for a slow (e.g. network) directory. Once mounted, all
+    files below root are read from and written to a copy in cache_dir.
+
+    A cached file is used as long as its size and modification time match
+    the file below root, or without checking for ttl seconds after the last
+    check. Writes return once the cached copy is written and are uploaded by
+    a background thread after flush_delay seconds, repeated writes of a file
+    are uploaded once. flush() waits for the pending uploads, sync() also
+    makes them durable and is called by Dataset.write().
+    """
+
+    def __init__(self, root, cache_dir, flush_delay=0.1, ttl=None):
+        root = os.path.abspath(str(root))
+        self._root = root
+        self._prefix = root if root.endswith('/') else root + '/'
+        self._cache_dir = os.path.abspath(str(cache_dir))
+        self._flush_delay = flush_delay
+        self._ttl = ttl
+        self._lock = threading.Condition()
+        self._upload_lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._generation = 0
+        self._validated = {}
+        self._unsynced = set()
+        self._thread = None
+        self._error = None
+        self._hits = 0
+        self._misses = 0
+        self._uploads = 0
+        os.makedirs(self._cache_dir, exist_ok=True)
+        self._register()
+        atexit.register(self.flush)
+
+    def stats(self):
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "uploads": self._uploads,
+            "pending": len(self._pending),
+        }
+
+    #
+    # ----------- Mounting -----------
+    #
+    def mountpoint(self):
+        return self._root
+
+    def includes(self, path):
+        path = str(path)
+        return path == self._root or path.startswith(self._prefix)
+
+    def unmount(self):
+        self.flush()
+        self._unregister()
+        return self
+
+    def _register(self):
+        from .io import register_file_system
+        register_file_system(self)
+        return self
+
+    def _unregister(self):
+        from .io import unregister_file_system
+        unregister_file_system(self)
+        return self
+
+    #
+    # ----------- Lookup -----------
+    #
+    def _rel(self, path):
+        path = str(path)
+        if path == self._root:
+            return ''
+        if not path.startswith(self._prefix):
+            raise KeyError(path)
+        rel = os.path.normpath(path[len(self._prefix):])
+        if rel == '.':
+            return ''
+        if rel.startswith('..'):
+            raise KeyError(path)
+        return rel
+
+    def _remote(self, rel):
+        return os.path.join(self._root, rel) if rel != '' else self._root
+
+    def _local(self, rel):
+        return os.path.join(self._cache_dir, rel) if rel != '' else self._cache_dir
+
+    def _cached(self, path):
+        """ _cached(path):
+        Returns the filename of an up-to-date copy of path in the cache
+        """
+        rel = self._rel(path)
+        local = self._local(rel)
+        with self._lock:
+            if rel in self._pending:
+                return local
+            validated = self._validated.get(rel)
+        if self._ttl is not None and validated is not None and time.time() - validated < self._ttl:
+            self._hits += 1
+            return local
+
+        remote = os.stat(self._remote(rel))
+        try:
+            cached = os.stat(local)
+            hit = cached.st_size == remote.st_size and cached.st_mtime_ns == remote.st_mtime_ns
+        except FileNotFoundError:
+            hit = False
+
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+            self._download(rel, local)
+        with self._lock:
+            self._validated[rel] = time.time()
+        return local
+
+    def _download(self, rel, local):
+        from .io import _fast_copy
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".itypes-", dir=os.path.dirname(local))
+        os.close(fd)
+        try:
+            with open(self._remote(rel), "rb") as f:
+                remote = os.fstat(f.fileno())
+            _fast_copy(self._remote(rel), tmp)
+            # The cached copy carries the key (size, mtime) of the file it was taken from
+            os.utime(tmp, ns=(remote.st_atime_ns, remote.st_mtime_ns))
+            with self._lock:
+                if rel in self._pending:
+                    # Written while downloading, the written copy is newer
+                    os.remove(tmp)
+                    return
+                os.replace(tmp, local)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    #
+    # ----------- Write-back -----------
+    #
+    def _upload_next(self):
+        with self._upload_lock:
+            with self._lock:
+                if len(self._pending) == 0:
+                    self._lock.notify_all()
+                    return False
+                rel, generation = next(iter(self._pending.items()))
+
+            from .io import _fast_copy
+            local = self._local(rel)
+            remote = self._remote(rel)
+            os.makedirs(os.path.dirname(remote), exist_ok=True)
+            tmp = os.path.join(os.path.dirname(remote), f".itypes-upload-{os.getpid()}-{os.path.basename(remote)}")
+            _fast_copy(local, tmp)
+            os.replace(tmp, remote)
+            stat = os.stat(remote)
+
+            with self._lock:
+                self._unsynced.add(remote)
+                self._uploads += 1
+                if self._pending.get(rel) == generation:
+                    # Not written again meanwhile, so the cached copy matches the uploaded one
+                    del self._pending[rel]
+                    os.utime(local, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                    self._validated[rel] = time.time()
+                self._lock.notify_all()
+            return True
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while len(self._pending) == 0 or self._error is not None:
+                    self._lock.wait()
+            time.sleep(self._flush_delay)
+            try:
+                while self._upload_next():
+                    pass
+            except Exception as e:
+                # Reported by the next flush(), which also retries
+                with self._lock:
+                    self._error = e
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="itypes-write-back", daemon=True)
+            self._thread.start()
+
+    def flush(self, fsync=False):
+        """ flush(fsync=False):
+        Uploads all pending writes, with fsync=True the uploaded files are also flushed to stable storage
+        """
+        with self._lock:
+            self._error = None
+        while self._upload_next():
+            pass
+
+        if fsync:
+            with self._lock:
+                files = self._unsynced
+                self._unsynced = set()
+            for file in files:
+                if os.path.exists(file):
+                    _fsync(file)
+            # Make the renames durable as well
+            for dir in set(os.path.dirname(file) for file in files):
+                _fsync(dir)
+        return self
+
+    def sync(self):
+        return self.flush(fsync=True)
+
+    #
+    # ----------- Access -----------
+    #
+    def __getitem__(self, file):
+        with open(self._cached(file), "rb") as f:
+            return f.read()
+
+    def __contains__(self, file):
+        if not self.includes(file):
+            return False
+        return self.exists(file)
+
+    def __setitem__(self, file, data):
+        rel = self._rel(file)
+        if rel == '':
+            raise IsADirectoryError(str(file))
+        local = self._local(rel)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        tmp = _write_temp_file(local, data)
+        with self._lock:
+            try:
+                os.replace(tmp, local)
+            except BaseException:
+                os.remove(tmp)
+                raise
+            self._generation += 1
+            # Rewritten files move to the end, so files are uploaded in the order they were last written
+            self._pending.pop(rel, None)
+            self._pending[rel] = self._generation
+            self._error = None
+            self._lock.notify_all()
+        self._start()
+
+    def open(self, file, mode):
+        if 'w' in mode:
+            if 'a' in mode:
+                raise NotImplementedError
+            return _BytesWriter(self, file) if 'b' in mode else _TextWriter(self, file)
+
+        if 'r' not in mode:
+            raise NotImplementedError
+        return open(self._cached(file), mode)
+
+    def buffer(self, file):
+        from .io import _read_os_buffer
+        return _read_os_buffer(self._cached(file))
+
+    def exists(self, path):
+        rel = self._rel(path)
+        with self._lock:
+            if rel in self._pending:
+                return True
+        return os.path.exists(self._remote(rel)) or os.path.isdir(self._local(rel))
+
+    def is_dir(self, path):
+        if not self.includes(path):
+            return False
+        rel = self._rel(path)
+        return os.path.isdir(self._remote(rel)) or os.path.isdir(self._local(rel))
+
+    def mkdir(self, path):
+        # Directories below root are created when the first file in them is uploaded
+        os.makedirs(self._local(self._rel(path)), exist_ok=True)
+
+    def remove(self, path):
+        rel = self._rel(path)
+        with self._upload_lock, self._lock:
+            for key in list(self._pending.keys()):
+                if rel == '' or key == rel or key.startswith(rel + '/'):
+                    del self._pending[key]
+            for key in list(self._validated.keys()):
+                if rel == '' or key == rel or key.startswith(rel + '/'):
+                    del self._validated[key]
+
+            removed = _remove(self._local(rel))
+            removed = _remove(self._remote(rel)) or removed
+            if rel == '':
+                os.makedirs(self._cache_dir, exist_ok=True)
+                os.makedirs(self._root, exist_ok=True)
+            elif not removed:
+                raise FileNotFoundError(str(path))
+
+    def scandir(self, path):
+        """ scandir(path):
+        Returns the names of the files and of the directories in path
+        """
+        from .path import _scan_dir
+        rel = self._rel(path)
+        files, dirs = set(), set()
+        found = False
+        for dir in (self._remote(rel), self._local(rel)):
+            if not os.path.isdir(dir):
+                continue
+            found = True
+            dir_files, dir_dirs = _scan_dir(dir, None)
+            dirs.update(dir_dirs)
+            if dir == self._remote(rel):
+                files.update(name for name in dir_files if not name.startswith(".itypes-upload-"))
+
+        with self._lock:
+            for key in self._pending.keys():
+                if os.path.dirname(key) == rel:
+                    files.add(os.path.basename(key))
+        if not found:
+            raise FileNotFoundError(str(path))
+        return sorted(files), sorted(dirs)
+
+    def stat(self, path):
+        rel = self._rel(path)
+        with self._lock:
+            pending = rel in self._pending
+        if pending:
+            return os.stat(self._local(rel))
+        try:
+            return os.stat(self._remote(rel))
+        except FileNotFoundError:
+            if os.path.isdir(self._local(rel)):
+                return os.stat(self._local(rel))
+            raise
+
+    def list_dirs(self, path=None):
+        path = Path(path if path is not None else self._root)
+        files, dirs = self.scandir(path)
+        return [path.cd(name) for name in dirs]
+
+    def list_files(self, path=None):
+        path = Path(path if path is not None else self._root)
+        files, dirs = self.scandir(path)
+        return [path.file(name) for name in files]
+
+    def __str__(self):
+        return f"CachingFileSystem({self._root} -> {self._cache_dir}, {len(self._pending)} pending)"
@@ -10,20 +10,36 @@
 import os
 import re
 import shutil
-from copy import deepcopy
-from .io import read, write
+from .io import read, write, copy_file, _is_filesystem_file
 from .helper import split_path
+from .path import Path
 from ..wildcard import wildcard_match
 
 
 rx_id = re.compile(r'\d+')
 
 
+_unknown = object()
+
+
+def _make_file(name, path):
+    file = File.__new__(File)
+    file._init(name, path)
+    return file
+
+
 class File:
-    def __init__(self, name, path=None):
-        from .path import Path
+    """
+    Immutable file name within a Path, see Path.
+    """
 
+    __slots__ = ("_name", "_path", "_str", "_abs", "_ext")
+
+    def __init__(self, name, path=None):
         if isinstance(name, File):
+            if path is None:
+                self._init(name._name, name._path)
+                return
             name = name.str()
 
         if '/' in name:
@@ -38,8 +54,18 @@ class File:
         if path is None:
             path = Path()
 
+        self._init(name, path)
+
+    def _init(self, name, path):
         self._name = name
         self._path = path
+        dir = path._str
+        self._str = dir + name if dir == '' or dir.endswith('/') else dir + '/' + name
+        self._abs = None
+        self._ext = _unknown
+
+    def __reduce__(self):
+        return (_make_file, (self._name, self._path))
 
     def open(self, mode):
         self._path.mkdir()
@@ -47,16 +73,22 @@ class File:
         return _open(self.str(), mode)
 
     def str(self):
-        return os.path.join(self._path.str(), self._name)
+        return self._str
 
     def abs(self):
-        return File(self._name, self._path.abs())
+        path = self._path.abs()
+        if path is self._path:
+            return self
+        cache = self._abs
+        if cache is None or cache._path is not path:
+            cache = _make_file(self._name, path)
+            self._abs = cache
+        return cache
 
     def rel_to(self, other):
         if isinstance(other, str):
-            from .path import Path
             other = Path(other)
-        return File(self._name, self._path.rel_to(other))
+        return _make_file(self._name, self._path.rel_to(other))
 
     def name(self):
         return self.basename(False)
@@ -74,26 +106,29 @@ class File:
         return exists(self.abs().str())
 
     def remove(self):
+        from .io import remove_file
         if self.exists():
-            os.remove(self.abs().str())
+            remove_file(self.abs().str())
 
     def __str__(self):
-        return self.str()
+        return self._str
 
     def __eq__(self, other):
-        return self.str() == other.str()
+        return self._str == other.str()
 
-    def replace_extension(self, ext):
-        n = self.clone()
-        basename = self.basename()
+    def __hash__(self):
+        return hash(self._str)
 
-        n._name = '%s.%s' % (basename, ext)
-        return n
+    def replace_extension(self, ext):
+        return _make_file('%s.%s' % (self.basename(), ext), self._path)
 
     def extension(self):
-        parts = self._name.split('.')
-        if len(parts) == 1: return None
-        return parts[-1]
+        ext = self._ext
+        if ext is _unknown:
+            base, dot, ext = self._name.rpartition('.')
+            if dot == '': ext = None
+            self._ext = ext
+        return ext
 
     def basename(self, wo_extension=True):
         fname = os.path.basename(self._name)
@@ -114,16 +149,14 @@ class File:
         """ prepend_extension(ext):
         E.g. Path('/a/b/f.e').prepend_extension('x') returns '/a/b/f.x.e'
         """
-        n = self.clone()
-
-        parts = n._name.split('.')
+        parts = self._name.split('.')
         if len(parts) == 1:
-            n._name = '%s%s%s' % (n._name, sep, ext)
+            name = '%s%s%s' % (self._name, sep, ext)
         else:
-            n._name = '.'.join(parts[:-1])
-            n._name += sep + ext + '.' + parts[-1]
+            name = '.'.join(parts[:-1])
+            name += sep + ext + '.' + parts[-1]
 
-        return n
+        return _make_file(name, self._path)
 
     def str_index(self):
         """ str_id():
@@ -142,11 +175,9 @@ class File:
         return int(x)
 
     def clone(self):
-        return deepcopy(self)
+        return self
 
     def copy_to(self, other, follow_symlinks=False):
-        from .path import Path
-
         if isinstance(other, str):
             other = File(other)
 
@@ -157,6 +188,9 @@ class File:
             other.mkdir()
             other = File(self._name, other)
         dst_name = other.abs().str()
+        if _is_filesystem_file(src_name) or _is_filesystem_file(dst_name):
+            copy_file(src_name, dst_name)
+            return
         if os.path.exists(dst_name):
             os.remove(dst_name)
         shutil.copyfile(src_name, dst_name, follow_symlinks=follow_symlinks)
@@ -11,13 +11,19 @@ import os
 import io
 import sys
 import re
+import math
+import shutil
+import hashlib
+import threading
 import numpy as np
 from collections import OrderedDict
+from contextlib import contextmanager
 
 #
 # ----------- Type Registry -----------
 #
 from ..conversion import convert_dims, convert_device, convert_dtype
+from ..profiler import profiler
 
 _read_functions = {}
 _write_functions = {}
@@ -43,100 +49,251 @@ def register_write_function(ext, func, type=""):
     else:
         _write_functions[ext] = (type, func)
 
-# Memory filesystems
+# Memory filesystems, sorted by decreasing mountpoint length so that the
+# first one including a path is the one with the longest matching mountpoint
 _filesystems = []
 
 def register_file_system(filesystem):
     global _filesystems
     if filesystem not in _filesystems:
         _filesystems.append(filesystem)
+        _filesystems.sort(key=lambda fs: -len(fs.mountpoint()))
 
 def unregister_file_system(filesystem):
     global _filesystems
     if filesystem in _filesystems:
         _filesystems.remove(filesystem)
 
-def _open(filename, mode):
-    global _filesystems
+def _find_file_system(filename):
+    for fs in _filesystems:
+        if fs.includes(filename):
+            return fs
+    return None
 
-    if 'w' in mode:
-        for fs in _filesystems:
-            if fs.includes(filename):
-                if 'a' in mode:
-                    raise NotImplementedError
-                if 'b' in mode: data = io.BytesIO()
-                else: data = io.StringIO()
-                data.close = lambda: None
-                fs[filename] = data
-                return data
-
-    if 'r' in mode:
-        for fs in _filesystems:
-            if fs.includes(filename):
-                if 'b' in mode: data = io.BytesIO(fs[filename])
-                else: data = io.StringIO(fs[filename])
-                return data
+def _open(filename, mode):
+    fs = _find_file_system(filename)
+    if fs is not None:
+        return fs.open(filename, mode)
 
     return open(filename, mode)
 
 def _open_file_for_reading(filename, binary=True):
-    global _filesystems
-    for fs in _filesystems:
-        if fs.includes(filename):
-            data = fs[filename]
-            return io.BytesIO(data)
+    fs = _find_file_system(filename)
+    if fs is not None:
+        return fs.open(filename, "r" if not binary else "rb")
 
     return open(filename, "r" if not binary else "rb")
 
+def _read_buffer(filename):
+    """ _read_buffer(filename):
+    Returns the content of a file as a buffer for np.frombuffer(). Buffers of mounted filesystems
+    are read-only views of the stored data, files on disk are read into a writable buffer.
+    """
+    fs = _find_file_system(filename)
+    if fs is not None:
+        return fs.buffer(filename)
+    return _read_os_buffer(filename)
+
+def _read_os_buffer(filename):
+    with open(filename, "rb") as f:
+        buffer = bytearray(os.fstat(f.fileno()).st_size)
+        view = memoryview(buffer)
+        pos = 0
+        while pos < len(buffer):
+            n = f.readinto(view[pos:])
+            if not n:
+                break
+            pos += n
+    return view[:pos]
+
+def _header_reader(buffer, size=1024):
+    # File object over the start of a buffer to parse text headers, tell() gives the data offset
+    return io.BytesIO(bytes(buffer[:size]))
+
 def _write_file(filename, data, binary=True):
-    global _filesystems
-    for fs in _filesystems:
-        if fs.includes(filename):
-            fs[filename] = data
-            return
+    fs = _find_file_system(filename)
+    if fs is not None:
+        fs[filename] = data
+        return
 
     open(filename, "w" if not binary else "wb").write(data)
 
-def _is_filesystem_file(filename): 
-    global _filesystems
-    for fs in _filesystems:
-        if fs.includes(filename):
-            return True
-        
-    return False 
+def _open_file_for_writing(filename, binary=True):
+    fs = _find_file_system(filename)
+    if fs is not None:
+        return fs.open(filename, "w" if not binary else "wb")
+
+    return open(filename, "w" if not binary else "wb")
+
+@contextmanager
+def _open_file_for_replacing(filename):
+    """ _open_file_for_replacing(filename):
+    Opens a binary file which replaces filename when the with block succeeds, an existing file is kept otherwise
+    """
+    fs = _find_file_system(filename)
+    if fs is not None:
+        f = io.BytesIO()
+        yield f
+        fs[filename] = f.getvalue()
+        return
+
+    # Created next to filename so that it can be renamed, with the permissions open() would give it
+    tmp = os.path.join(os.path.dirname(os.path.abspath(filename)),
+                       f".itypes-{os.getpid()}-{threading.get_ident()}-{os.path.basename(filename)}")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp, filename)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def _is_filesystem_file(filename):
+    return _find_file_system(filename) is not None
 
 def mkdirs(path):
-    global _filesystems
-    for fs in _filesystems:
-        if fs.includes(path):
-            fs.mkdir(path)
-            return
+    fs = _find_file_system(path)
+    if fs is not None:
+        fs.mkdir(path)
+        return
 
     from pathlib import Path
     Path(path).mkdir(parents=True, exist_ok=True)
     return path
 
 def exists(filename):
-    global _filesystems
-    for fs in _filesystems:
-        if filename in fs:
-            return True
+    fs = _find_file_system(filename)
+    if fs is not None:
+        return fs.exists(filename)
 
     return os.path.exists(filename)
 
 def is_dir(filename):
-    global _filesystems
-    for fs in _filesystems:
-        if filename in fs:
-            return True
+    fs = _find_file_system(filename)
+    if fs is not None:
+        return fs.is_dir(filename)
 
     return os.path.isdir(filename)
 
+def sync(path):
+    """ sync(path):
+    Waits until the pending writes of the filesystem mounted at path are stored durably
+    """
+    fs = _find_file_system(path)
+    if fs is not None:
+        fs.sync()
+
+def remove_file(filename):
+    fs = _find_file_system(filename)
+    if fs is not None:
+        fs.remove(filename)
+        return
+
+    os.remove(filename)
+
+def remove_dir(path):
+    fs = _find_file_system(path)
+    if fs is not None:
+        fs.remove(path)
+        return
+
+    shutil.rmtree(path)
+
+# ioctl request to share the data blocks of a file (btrfs, xfs, ...)
+_FICLONE = 0x40049409
+
+def _reflink(fsrc, fdst):
+    try:
+        import fcntl
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except (ImportError, OSError):
+        return False
+
+def _copy_file_range(fsrc, fdst):
+    if not hasattr(os, 'copy_file_range'):
+        return False
+
+    size = os.fstat(fsrc.fileno()).st_size
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError:
+        return False
+    return copied == size
+
+def _fast_copy(src, dst):
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        # Try a copy-on-write clone first, then an in-kernel (possibly server-side) copy
+        if _reflink(fsrc, fdst) or _copy_file_range(fsrc, fdst):
+            return
+
+    shutil.copyfile(src, dst)
+
+def _same_file(src, dst):
+    src, dst = str(src), str(dst)
+    if os.path.normpath(os.path.abspath(src)) == os.path.normpath(os.path.abspath(dst)):
+        return True
+    if _is_filesystem_file(src) or _is_filesystem_file(dst):
+        return False
+    try:
+        return os.path.samefile(src, dst)
+    except OSError:
+        return False
+
+def copy_file(src, dst):
+    # Removing dst first would remove src
+    if _same_file(src, dst):
+        return
+
+    if _is_filesystem_file(src) or _is_filesystem_file(dst):
+        _write_file(dst, _open_file_for_reading(src).read())
+        return
+
+    if os.path.lexists(dst):
+        os.remove(dst)
+    _fast_copy(src, dst)
+
+def link_file(src, dst):
+    if _same_file(src, dst):
+        return
+
+    if _is_filesystem_file(src) or _is_filesystem_file(dst):
+        copy_file(src, dst)
+        return
+
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Hard links are not possible across devices or on some filesystems
+        _fast_copy(src, dst)
+
+def file_digest(filename, chunk_size=1024*1024):
+    digest = hashlib.sha256()
+    f = _open_file_for_reading(filename)
+    with f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 #
 # ----------- Proxy Functions -----------
 #
 def read(file, *args, **kwargs):
+    if profiler.enabled:
+        from .file import File
+        return profiler.call(f"io.read.{File(file).extension()}", _read, file, *args, **kwargs)
+    return _read(file, *args, **kwargs)
+
+def _read(file, *args, **kwargs):
     global _read_functions
     from .file import File
 
@@ -161,7 +318,10 @@ def read(file, *args, **kwargs):
         device = kwargs.pop("device", "numpy")
 
     # Low-level read
-    value = func(file.abs().str(), *args, **kwargs)
+    if profiler.enabled:
+        value = profiler.call(f"io.decode.{ext}", func, file.abs().str(), *args, **kwargs)
+    else:
+        value = func(file.abs().str(), *args, **kwargs)
 
     # Post-process
     if "image" in type:
@@ -189,6 +349,12 @@ def read(file, *args, **kwargs):
     return value
 
 def write(file, data, *args, **kwargs):
+    if profiler.enabled:
+        from .file import File
+        return profiler.call(f"io.write.{File(file).extension()}", _write, file, data, *args, **kwargs)
+    return _write(file, data, *args, **kwargs)
+
+def _write(file, data, *args, **kwargs):
     global _write_functions
     from .file import File
 
@@ -208,7 +374,10 @@ def write(file, data, *args, **kwargs):
             dims = kwargs.pop("dims")
             data = convert_dims(data, dims, "hwc")
 
-    value = func(file.abs().str(), data, *args, **kwargs)
+    if profiler.enabled:
+        value = profiler.call(f"io.encode.{ext}", func, file.abs().str(), data, *args, **kwargs)
+    else:
+        value = func(file.abs().str(), data, *args, **kwargs)
 
     return value
 
@@ -237,9 +406,42 @@ register_write_function('p', write_pickle)
 # ----------- Numpy (.np, .npy) -----------
 #
 
+def _npy_from_buffer(buffer):
+    # Array aliasing buffer for .npy data without objects, None otherwise
+    fmt = np.lib.format
+    if bytes(buffer[:len(fmt.MAGIC_PREFIX)]) != fmt.MAGIC_PREFIX:
+        return None
+    version = (buffer[6], buffer[7])
+    if version == (1, 0):
+        start = 10
+        header_len = int.from_bytes(buffer[8:10], 'little')
+    elif version == (2, 0):
+        start = 12
+        header_len = int.from_bytes(buffer[8:12], 'little')
+    else:
+        return None
+
+    f = io.BytesIO(bytes(buffer[:start + header_len]))
+    fmt.read_magic(f)
+    if version == (1, 0): shape, fortran_order, dtype = fmt.read_array_header_1_0(f)
+    else:                 shape, fortran_order, dtype = fmt.read_array_header_2_0(f)
+    if dtype.hasobject:
+        return None
+
+    count = 1
+    for dim in shape:
+        count *= dim
+    data = np.frombuffer(buffer, dtype, count, f.tell())
+    if fortran_order:
+        return data.reshape(shape[::-1]).transpose()
+    return data.reshape(shape)
+
 def read_numpy(filename):
-    f = _open_file_for_reading(filename)
-    return np.load(f, allow_pickle=True)
+    buffer = _read_buffer(filename)
+    data = _npy_from_buffer(buffer)
+    if data is not None:
+        return data
+    return np.load(io.BytesIO(buffer), allow_pickle=True)
 
 register_read_function(('np', 'npy'), read_numpy)
 
@@ -314,73 +516,166 @@ register_write_function('json', write_json)
 # ----------- Image (.exr) -----------
 #
 
-def read_exr(filename):
-    if _is_filesystem_file(filename): 
-        raise NotImplementedError("read_exr() does not support memory filesystems")
-    
-    import OpenEXR, Imath
-    pt = Imath.PixelType(Imath.PixelType.FLOAT)
-    file = OpenEXR.InputFile(filename)
-    dw = file.header()['dataWindow']
-    w, h = (dw.max.x - dw.min.x + 1, dw.max.y - dw.min.y + 1)
-    channels = file.header()['channels'].keys()
+def _exr_channel_names(names):
+    # R, G, B and A first, e.g. for RGBA images, then the remaining channels in alphabetical order
+    first = [name for name in ('R', 'G', 'B', 'A') if name in names]
+    return first + sorted(name for name in names if name not in first)
+
+def _exr_input(filename):
+    # OpenEXR reads files on disk itself, files of mounted filesystems from an in-memory stream
+    return _open_file_for_reading(filename) if _is_filesystem_file(filename) else filename
+
+def _exr_interleave(arrays, names, shape):
+    data = np.empty(shape + (len(names),), dtype=np.float32)
+    for i, name in enumerate(names):
+        if arrays[name].shape != shape:
+            raise Exception(f"Don't know how to read EXR channel {name} with subsampling")
+        data[:, :, i] = arrays[name]
+    return data
 
+def _exr_read(OpenEXR, source):
+    try:
+        # Lets OpenEXR decode R, G, B and A into a single interleaved array
+        file = OpenEXR.File(source, separate_channels=False)
+    except ValueError:
+        # R, G, B and A with different pixel types can't be interleaved by OpenEXR
+        if not isinstance(source, str):
+            source.seek(0)
+        file = OpenEXR.File(source, separate_channels=True)
+
+    arrays = {}
+    for key, channel in file.channels().items():
+        pixels = channel.pixels
+        if len(pixels.shape) == 3:
+            for i, name in enumerate(key):
+                arrays[name] = pixels[:, :, i]
+        else:
+            arrays[key] = pixels
+    names = _exr_channel_names(arrays.keys())
+
+    if len(names) == 1:
+        return arrays[names[0]].astype(np.float32, copy=False)
+
+    channels = file.channels()
     if len(channels) == 1:
-        ch = 'R' if 'R' in channels else 'Y'
-        data = np.fromstring(file.channel(ch, pt), dtype=np.float32)
-        data.shape = (h, w)
+        key, channel = next(iter(channels.items()))
+        if key == ''.join(names) and channel.pixels.dtype == np.float32:
+            return channel.pixels
 
-    elif len(channels) >= 3:
-        data = np.zeros((h, w, len(channels)), dtype=np.float32)
+    dw = file.header()['dataWindow']
+    return _exr_interleave(arrays, names, (int(dw[1][1] - dw[0][1]) + 1, int(dw[1][0] - dw[0][0]) + 1))
 
-        red = np.frombuffer(file.channel('R', pt), dtype=np.float32)
-        red.shape = (h, w)
-        data[:, :, 0] = red
+def read_exr_regions(filename, rois):
+    """ read_exr_regions(filename, rois):
+    Reads regions (top, bottom, left, right) of an EXR file like read_exr(). Only the scanlines
+    of the regions are decoded.
+    """
+    import OpenEXR, Imath
 
-        green = np.frombuffer(file.channel('G', pt), dtype=np.float32)
-        green.shape = (h, w)
-        data[:, :, 1] = green
+    file = OpenEXR.InputFile(_exr_input(filename))
+    header = file.header()
+    dw = header['dataWindow']
+    w, h = (dw.max.x - dw.min.x + 1, dw.max.y - dw.min.y + 1)
+    names = _exr_channel_names(header['channels'].keys())
+    pt = Imath.PixelType(Imath.PixelType.FLOAT)
 
-        blue = np.frombuffer(file.channel('B', pt), dtype=np.float32)
-        blue.shape = (h, w)
-        data[:, :, 2] = blue
+    values = []
+    for top, bottom, left, right in rois:
+        if not (0 <= top < bottom <= h and 0 <= left < right <= w):
+            raise Exception(f"EXR region {(top, bottom, left, right)} is outside of the {h}x{w} image")
+
+        # Decoded as float, also for half channels
+        rows = file.channels(names, pt, dw.min.y + top, dw.min.y + bottom - 1)
+        arrays = {name: np.frombuffer(row, dtype=np.float32).reshape(bottom - top, w) for name, row in zip(names, rows)}
+        if len(names) == 1:
+            value = arrays[names[0]]
+        else:
+            value = _exr_interleave(arrays, names, (bottom - top, w))
+        values.append(value[:, left:right] if left != 0 or right != w else value)
+    return values
+
+def read_exr(filename, roi=None):
+    """ read_exr(filename, roi=None):
+    Reads all channels as float32 (h, w, c) with R, G, B and A first, a single channel as (h, w).
+    With roi=(top, bottom, left, right) only the given region is decoded.
+    """
+    import OpenEXR
 
-    else:
-        raise Exception(f"Don't know how to read EXR with {channels} channels")
+    if roi is not None or not hasattr(OpenEXR, "File"):
+        if roi is None:
+            # OpenEXR before 3.3, read the whole data window
+            header = OpenEXR.InputFile(_exr_input(filename)).header()
+            dw = header['dataWindow']
+            roi = (0, dw.max.y - dw.min.y + 1, 0, dw.max.x - dw.min.x + 1)
+        return read_exr_regions(filename, [roi])[0]
 
-    return data
+    return _exr_read(OpenEXR, _exr_input(filename))
 
 register_read_function('exr', read_exr, type='data,image')
 
-def write_exr(filename, data):
-    if _is_filesystem_file(filename): 
-        raise NotImplementedError("write_exr() does not support memory filesystems")
-
+def write_exr(filename, data, half=False, compression=None):
+    """ write_exr(filename, data, half=False, compression=None):
+    Writes 1 to 4 channels as R, G, B and A, more channels as C000, C001, ... Channels are stored
+    as half floats with half=True or for float16 data, compression defaults to ZIP.
+    """
     import OpenEXR
-    data = convert_dtype(data, np.float32)
-    if len(data.shape) == 3 and data.shape[2] == 3:
-        data = data.astype(np.float32)
-        h, w, c = data.shape
-        d = {}
-        d["R"] = data[:, :, 0].tostring()
-        if c > 1:
-            d["G"] = data[:, :, 1].tostring()
-        if c > 2:
-            d["B"] = data[:, :, 2].tostring()
-
-        exr = OpenEXR.OutputFile(filename, OpenEXR.Header(w, h))
-        exr.writePixels(d)
-
-    elif len(data.shape) == 2 or (len(data.shape) == 3 and data.shape[2] == 1):
-        data = data.squeeze()
-
-        h, w = data.shape
-        exr = OpenEXR.OutputFile(filename, OpenEXR.Header(w, h))
-        exr.writePixels({"R": data.tostring()})
 
+    if data.dtype == np.float16:
+        half = True
     else:
+        data = convert_dtype(data, np.float32)
+    data = np.ascontiguousarray(data, dtype=np.float16 if half else np.float32)
+
+    if len(data.shape) == 2:
+        data = data[:, :, None]
+    if len(data.shape) != 3:
         raise Exception(f"Don't know how to write EXR with {data.shape} dimensions")
 
+    h, w, c = data.shape
+    names = list('RGBA'[:c]) if c <= 4 else [f"C{i:03d}" for i in range(c)]
+
+    if not hasattr(OpenEXR, "File"):
+        # OpenEXR before 3.3
+        import Imath
+        header = OpenEXR.Header(w, h)
+        pt = Imath.PixelType(Imath.PixelType.HALF if half else Imath.PixelType.FLOAT)
+        header['channels'] = {name: Imath.Channel(pt) for name in names}
+        if compression is not None:
+            header['compression'] = Imath.Compression(compression)
+        pixels = {name: data[:, :, i].tobytes() for i, name in enumerate(names)}
+        if not _is_filesystem_file(filename):
+            exr = OpenEXR.OutputFile(filename, header)
+            exr.writePixels(pixels)
+            exr.close()
+            return
+
+        # OutputFile only writes to files
+        import tempfile
+        with tempfile.TemporaryDirectory(prefix="itypes-exr-") as dir:
+            exr = OpenEXR.OutputFile(os.path.join(dir, "image.exr"), header)
+            exr.writePixels(pixels)
+            exr.close()
+            with open(os.path.join(dir, "image.exr"), "rb") as f:
+                _write_file(filename, f.read())
+        return
+
+    if c in (3, 4):
+        # Passed interleaved, without splitting the channels
+        channels = {''.join(names): data}
+    else:
+        channels = {name: np.ascontiguousarray(data[:, :, i]) for i, name in enumerate(names)}
+    header = {
+        "compression": compression if compression is not None else OpenEXR.ZIP_COMPRESSION,
+        "type": OpenEXR.scanlineimage
+    }
+    exr = OpenEXR.File(header, channels)
+
+    if _is_filesystem_file(filename):
+        with _open_file_for_writing(filename) as f:
+            exr.write(f)
+    else:
+        exr.write(filename)
+
 register_write_function('exr', write_exr, type='data,image')
 
 
@@ -388,12 +683,133 @@ register_write_function('exr', write_exr, type='data,image')
 # ----------- Image (.jpg, .png, .bmp, .tif) -----------
 #
 
-def read_image(filename):
+_modules = {}
+
+def _has_module(name):
+    if name not in _modules:
+        try:
+            __import__(name)
+            _modules[name] = True
+        except ImportError:
+            _modules[name] = False
+    return _modules[name]
+
+def image_decoders(format):
+    """ image_decoders(format):
+    Returns the available decoders for an image extension, fastest first. PIL is always available,
+    simplejpeg, pyspng and cv2 are used when installed.
+    """
+    candidates = {'jpg': ('simplejpeg', 'cv2'), 'png': ('pyspng', 'cv2')}.get(format, ())
+    return [name for name in candidates if _has_module(name)] + ['pil']
+
+def _scaled_size(width, height, scale):
+    # Rounded up like the scaled DCT decoding of libjpeg
+    return max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))
+
+def _resize(value, size):
+    from PIL import Image
+    return np.asarray(Image.fromarray(value).resize(size, Image.BOX))
+
+def _png_header(buffer):
+    # Bit depth and color type from the IHDR chunk
+    if bytes(buffer[:8]) != b'\x89PNG\r\n\x1a\n':
+        return None, None
+    return buffer[24], buffer[25]
+
+def _decode_image(buffer, format, decoder, scale):
+    """ _decode_image(buffer, format, decoder, scale):
+    Decodes with an optional decoder, returns None where the result could differ from PIL
+    (palette or CMYK images), these are left to PIL
+    """
+    if format == 'jpg' and decoder == 'simplejpeg':
+        import simplejpeg
+        height, width, colorspace, subsampling = simplejpeg.decode_jpeg_header(buffer)
+        if colorspace not in ('Gray', 'YCbCr', 'RGB'):
+            return None
+        gray = colorspace == 'Gray'
+        kwargs = {}
+        if scale is not None:
+            width, height = _scaled_size(width, height, scale)
+            # Decodes at the smallest DCT scale which is at least min_width x min_height
+            kwargs = {"min_width": width, "min_height": height}
+        value = simplejpeg.decode_jpeg(buffer, colorspace='GRAY' if gray else 'RGB', **kwargs)
+        if gray:
+            value = value[:, :, 0]
+        if value.shape[1] != width or value.shape[0] != height:
+            value = _resize(value, (width, height))
+        return value
+
+    if format == 'png' and decoder == 'pyspng':
+        import pyspng
+        depth, color_type = _png_header(buffer)
+        if color_type not in (0, 2, 4, 6):
+            return None
+        value = pyspng.load(buffer if isinstance(buffer, bytes) else bytes(buffer))
+        if len(value.shape) == 3 and value.shape[2] == 1:
+            value = value[:, :, 0]
+        if scale is not None:
+            value = _resize(value, _scaled_size(value.shape[1], value.shape[0], scale))
+        return value
+
+    if decoder == 'cv2':
+        import cv2
+        if format == 'png':
+            depth, color_type = _png_header(buffer)
+            if color_type not in (0, 2, 6):
+                return None
+        elif scale is not None:
+            # Scaled JPEG decoding is left to PIL's draft mode
+            return None
+        value = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_UNCHANGED)
+        if value is None:
+            raise Exception("cv2 failed to decode image")
+        if len(value.shape) == 3:
+            value = cv2.cvtColor(value, cv2.COLOR_BGR2RGB if value.shape[2] == 3 else cv2.COLOR_BGRA2RGBA)
+        if scale is not None:
+            value = _resize(value, _scaled_size(value.shape[1], value.shape[0], scale))
+        return value
+
+    raise Exception(f"Unknown {format} decoder '{decoder}'")
+
+def read_image(filename, scale=None, decoder=None):
+    """ read_image(filename, scale=None, decoder=None):
+    Decodes with the given decoder (see image_decoders()) or the fastest available one.
+    With scale, e.g. 1/2, the image is downscaled, JPEGs are directly decoded at the lower
+    resolution where possible.
+    """
+    from .file import File
+    format = File(filename).extension()
+
+    decoders = image_decoders(format)
+    if decoder is None:
+        decoder = decoders[0]
+    elif decoder not in decoders:
+        raise Exception(f"Image decoder '{decoder}' is not available for {format}")
+
+    if decoder != 'pil':
+        value = _decode_image(_read_buffer(filename), format, decoder, scale)
+        if value is not None:
+            return value
+
     f = _open_file_for_reading(filename)
 
     from PIL import Image
 
-    value = np.asarray(Image.open(f))
+    image = Image.open(f)
+    if scale is not None:
+        size = _scaled_size(image.size[0], image.size[1], scale)
+        if image.format == 'JPEG':
+            # Let libjpeg decode at 1/2, 1/4 or 1/8 of the resolution
+            image.draft(image.mode, size)
+        if image.size != size:
+            image = image.resize(size, Image.BOX)
+
+    # Older PIL versions read 16 bit PNGs as 32 bit, unpack them directly to 16 bit
+    if image.mode == 'I' and image.format == 'PNG':
+        width, height = image.size
+        return np.frombuffer(image.tobytes('raw', 'I;16'), np.uint16).reshape(height, width)
+
+    value = np.asarray(image)
 
     # Fix PIL bug on reading 16 bit as 32
     if value.dtype == np.int32:
@@ -403,16 +819,64 @@ def read_image(filename):
 
 register_read_function(('jpg', 'png', 'bmp', 'tif'), read_image, type='data,image')
 
-def write_image(filename, data):
-    f = io.BytesIO()
+_image_buffers = threading.local()
 
-    from PIL import Image
+def _image_uint8(data):
+    # Same result as convert_dtype(data, np.uint8), but clipped and scaled in place
+    # in a buffer which is reused for images of the same shape by the calling thread
+    if data.dtype != np.float32 and data.dtype != np.float64:
+        return convert_dtype(data, np.uint8)
+
+    key = (data.shape, data.dtype)
+    buffers = getattr(_image_buffers, "buffers", None)
+    if buffers is None or buffers[0] != key:
+        buffers = (key, np.empty(data.shape, data.dtype), np.empty(data.shape, np.uint8))
+        _image_buffers.buffers = buffers
+    key, scaled, value = buffers
 
+    np.multiply(data, 255.0, out=scaled)
+    np.clip(scaled, 0, 255, out=scaled)
+    np.copyto(value, scaled, casting='unsafe')
+    return value
+
+_pil_formats = {'jpg': 'JPEG', 'tif': 'TIFF'}
+
+def jpeg_encoders():
+    """ jpeg_encoders():
+    Returns the available JPEG encoders, fastest first. PIL is always available,
+    simplejpeg and cv2 are used when installed.
+    """
+    return [name for name in ('simplejpeg', 'cv2') if _has_module(name)] + ['pil']
+
+def _encode_jpeg(data, encoder):
+    # data is uint8 with one or three channels, encoded like PIL with quality 75 and 4:2:0 subsampling
+    if encoder == 'simplejpeg':
+        import simplejpeg
+        gray = len(data.shape) == 2
+        return simplejpeg.encode_jpeg(
+            np.ascontiguousarray(data[:, :, None] if gray else data),
+            quality=75,
+            colorspace='GRAY' if gray else 'RGB',
+            colorsubsampling='420'
+        )
+    if encoder == 'cv2':
+        import cv2
+        ok, buffer = cv2.imencode('.jpg', data if len(data.shape) == 2 else data[:, :, ::-1], [cv2.IMWRITE_JPEG_QUALITY, 75])
+        if not ok:
+            raise Exception("cv2 failed to encode JPEG")
+        return buffer
+    raise Exception(f"Unknown JPEG encoder '{encoder}'")
+
+def write_image(filename, data, encoder=None):
+    """ write_image(filename, data, encoder=None):
+    Writes PNG, BMP and TIFF with PIL, JPEG with the given encoder (see jpeg_encoders())
+    or the fastest available one
+    """
     # Convert data type
     if data.dtype == np.uint8 or data.dtype == np.uint16:
         pass
     else:
-        data = convert_dtype(data, np.uint8)
+        data = _image_uint8(data)
 
     # Remove additional dimensions
     data = data.squeeze()
@@ -421,9 +885,23 @@ def write_image(filename, data):
     file = File(filename)
     format = file.extension()
 
-    Image.fromarray(data).save(f, compress_level=1, format=format)
+    if format == 'jpg' and data.dtype == np.uint8 and (len(data.shape) == 2 or data.shape[2] == 3):
+        if encoder is None:
+            encoder = jpeg_encoders()[0]
+        elif encoder not in jpeg_encoders():
+            raise Exception(f"JPEG encoder '{encoder}' is not available")
+        if encoder != 'pil':
+            buffer = _encode_jpeg(data, encoder)
+            with _open_file_for_replacing(filename) as f:
+                f.write(buffer)
+            return
 
-    _write_file(filename, f.getvalue())
+    from PIL import Image
+
+    # Encode straight into the file instead of an intermediate buffer
+    image = Image.fromarray(data)
+    with _open_file_for_replacing(filename) as f:
+        image.save(f, compress_level=1, format=_pil_formats.get(format, format))
 
 register_write_function(('jpg', 'png', 'bmp', 'tif'), write_image, type='data,image')
 
@@ -433,7 +911,8 @@ register_write_function(('jpg', 'png', 'bmp', 'tif'), write_image, type='data,im
 #
 
 def read_pfm(file):
-    f = _open_file_for_reading(file)
+    buffer = _read_buffer(file)
+    f = _header_reader(buffer)
 
     header = f.readline().rstrip()
     if header.decode("ascii") == 'PF':
@@ -456,12 +935,14 @@ def read_pfm(file):
     else:
         endian = '>' # big-endian
 
-    data = np.fromfile(f, endian + 'f')
     shape = (height, width, 3) if color else (height, width, 1)
+    data = np.frombuffer(buffer, endian + 'f', shape[0] * shape[1] * shape[2], f.tell())
 
     data = np.reshape(data, shape)
     data = np.flipud(data)
 
+    if scale == 1 and data.dtype.isnative:
+        return data
     return data * scale
 
 register_read_function('pfm', read_pfm, type='data,image')
@@ -484,7 +965,7 @@ def write_pfm(filename, image, scale=1):
     else:
         raise Exception('Image must have H x W x 3, H x W x 1 or H x W dimensions.')
 
-    file.write('PF\n' if color else 'Pf\n'.encode())
+    file.write(('PF\n' if color else 'Pf\n').encode())
     file.write('%d %d\n'.encode() % (image.shape[1], image.shape[0]))
 
     endian = image.dtype.byteorder
@@ -502,22 +983,21 @@ register_write_function('pfm', write_pfm, type='data,image')
 
 
 #
-# ----------- Image (.pfm) -----------
+# ----------- Flow (.flo) -----------
 #
 
 def read_flow(name):
-    f = _open_file_for_reading(name)
+    buffer = _read_buffer(name)
 
-    header = f.read(4)
+    header = bytes(buffer[:4])
     if header.decode("utf-8") != 'PIEH':
         raise Exception('Flow file header does not contain PIEH')
 
-    width = np.fromfile(f, np.int32, 1).squeeze()
-    height = np.fromfile(f, np.int32, 1).squeeze()
+    width, height = np.frombuffer(buffer, np.int32, 2, 4)
 
-    flow = np.fromfile(f, np.float32, width * height * 2).reshape((height, width, 2))
+    flow = np.frombuffer(buffer, np.float32, width * height * 2, 12).reshape((height, width, 2))
 
-    return flow.astype(np.float32)
+    return flow
 
 register_read_function('flo', read_flow, type='data, flow')
 
@@ -544,7 +1024,8 @@ register_write_function('flo', write_flow, type='data, flow')
 #
 
 def read_blob(name):
-    f = _open_file_for_reading(name)
+    buffer = _read_buffer(name)
+    f = _header_reader(buffer)
 
     if(f.readline().decode("utf-8"))  != 'float32\n':
         raise Exception('float file %s did not contain <float32> keyword' % name)
@@ -561,7 +1042,7 @@ def read_blob(name):
     dims = list(reversed(dims))
 
     # This is to ensure you can do direct writes from C++
-    data = np.fromfile(f, np.float32, count).reshape(dims)
+    data = np.frombuffer(buffer, np.float32, count, f.tell()).reshape(dims)
     if dim == 2:
         data = np.transpose(data, (0, 1))
     elif dim == 3:
@@ -8,147 +8,327 @@
 ### --------------------------------------- ###
 
 import io
+import os
+import stat
+import time
+import shutil
+import weakref
+import tempfile
+import threading
 from collections import OrderedDict
 from .path import Path
 from .file import File
 
 
-class _DataItem:
-    def __init__(self, data=None):
-        self._data = data
+class _DirNode:
+    __slots__ = ("entries", "mtime")
 
-    def open(self, mode):
-        if 'w' in mode:
-            if 'a' in mode:
-                raise NotImplementedError
-            if 'b' in mode:
-                data = io.BytesIO()
-            else:
-                data = io.StringIO()
-            data.close = lambda: None
-            self._data = data
-            return data
+    def __init__(self):
+        self.entries = {}
+        self.mtime = time.time()
 
-        if 'r' in mode:
-            if self._data is None:
-                raise Exception("Tried to read from None _DataItem")
-            if 'b' in mode:
-                data = io.BytesIO(self.data())
-            else:
-                data = io.StringIO(self.data())
-            return data
-
-    def finalize(self):
-        self._data = self.data()
 
-    def data(self):
-        if hasattr(self._data, 'getvalue'): return self._data.getvalue()
-        return self._data
-
-    def __len__(self):
-        return len(self.data())
+class _FileNode:
+    __slots__ = ("_data", "_stream", "_size", "mtime", "dirty", "spill", "spill_owned", "spill_text")
 
+    def __init__(self, data=None, dirty=True):
+        self._data = data
+        self._stream = None
+        self._size = _size(data) if data is not None else 0
+        self.mtime = time.time()
+        self.dirty = dirty
+        # File holding the data while it is not resident, see MemoryFileSystem(capacity=...)
+        self.spill = None
+        self.spill_owned = False
+        self.spill_text = False
+
+    def resident(self):
+        return self._data is not None or self._stream is not None
+
+    def set_data(self, data):
+        self._data = data
+        self._stream = None
+        self._size = _size(data)
+        self.mtime = time.time()
+        self.dirty = True
 
-def _read_file(file):
-    f = file.open('rb')
-    return _DataItem(f.read())
+    def size(self):
+        if self._stream is not None:
+            return _size(self._stream.getvalue())
+        return self._size
 
 
-def _write_file(file, data):
-    file.path().mkdir()
-    data = data.data()
+def _size(data):
     if isinstance(data, str):
-        f = file.open('w')
-        f.write(data)
-    else:
-        f = file.open('wb')
-        f.write(data)
+        return len(data.encode())
+    return len(data)
 
 
-def _finalize(entries):
-    for entry, value in entries.items():
-        if isinstance(value, OrderedDict):
-            _finalize(value)
-        else:
-            value.finalize()
-
-
-def _read(path):
-    entries = OrderedDict()
-    for dir in path.list_dirs():
-        entries[dir.name()] = _read(dir)
-    for file in path.list_files():
-        entries[file.name()] = _read_file(file)
-    return entries
+class _BytesWriter(io.BytesIO):
+    def __init__(self, fs, node):
+        super().__init__()
+        self._fs = fs
+        self._node = node
 
+    def close(self):
+        if not self.closed and self._node._stream is self:
+            self._fs._set(self._node, self.getvalue())
+        super().close()
 
-def _write(path, entries):
-    for entry, value in entries.items():
-        if isinstance(value, OrderedDict):
-            _write(path.cd(entry), value)
-        else:
-            _write_file(path.file(entry), value)
-
-def _lookup(entries, parts):
-    if len(parts) == 0:
-        return entries
 
-    key = parts[0]
-    if key in entries.keys():
-        entries = entries[key]
-        return _lookup(entries, parts[1:])
+class _TextWriter(io.StringIO):
+    def __init__(self, fs, node):
+        super().__init__()
+        self._fs = fs
+        self._node = node
 
-    else:
-        raise KeyError(parts[0])
+    def close(self):
+        if not self.closed and self._node._stream is self:
+            self._fs._set(self._node, self.getvalue())
+        super().close()
 
 
-def _write_memory(entries, parts, data):
-    key = parts[0]
+def _to_data(data):
+    # Stored data is immutable, so that readers can get views of it
+    if hasattr(data, 'getvalue'):
+        data = data.getvalue()
+    if isinstance(data, memoryview) and data.readonly:
+        return data.cast('B') if data.c_contiguous else bytes(data)
+    if isinstance(data, (bytearray, memoryview)):
+        data = bytes(data)
+    return data
 
-    if len(parts) == 1:
-        entries[key] = data
-        return
 
-    if not key in entries.keys():
-        entries[key] = OrderedDict()
+def _file_nodes(node):
+    for child in node.entries.values():
+        if isinstance(child, _DirNode):
+            yield from _file_nodes(child)
+        else:
+            yield child
 
-    _write(entries[key], parts[1:], data)
 
 class MemoryFileSystem:
-    def __init__(self, mountpoint=None):
-        self._entries = OrderedDict()
+    """
+    Filesystem held in memory as a tree of directory and file nodes. Once
+    mounted, all files below the mountpoint are read and written through it
+    (see register_file_system()), lookups take O(depth).
+
+    With capacity (in bytes), the least recently used files are moved to
+    spill_dir (a temporary directory by default) when the resident data
+    exceeds the capacity and are loaded again when accessed.
+    """
+
+    def __init__(self, mountpoint=None, capacity=None, spill_dir=None):
+        self._root = _DirNode()
+        self._capacity = capacity
+        self._spill_base = spill_dir
+        self._spill_dir = None
+        self._spill_counter = 0
+        self._lru = OrderedDict()
+        self._lock = threading.RLock()
+        self._resident = 0
+        self._spilled = 0
+        self._spills = 0
+        self._reloads = 0
+        self._synced = None
         self.mount(mountpoint)
 
     def finalize(self):
-        _finalize(self._entries)
+        for node in _file_nodes(self._root):
+            if node._stream is not None:
+                self._set(node, node._stream.getvalue())
         return self
 
     def read_from_disk(self, path):
-        path = Path(path)
-        self._entries = _read(path)
+        """ read_from_disk(path):
+        Reads all files below path. With a capacity, the files are only loaded when accessed.
+        """
+        self._clear()
+        path = str(Path(path))
+        self._root = self._read_dir(path)
+        self._synced = os.path.abspath(path)
         return self
 
+    def write_to_disk(self, path):
+        """ write_to_disk(path):
+        Writes all files to path. Writing to the path last read from or written to only writes the files changed since.
+        """
+        path = str(Path(path))
+        dirty_only = self._synced == os.path.abspath(path)
+        self._write_dir(path, self._root, dirty_only)
+        self._synced = os.path.abspath(path)
+        return self
+
+    def _read_dir(self, dir):
+        node = _DirNode()
+        dirs = []
+        files = []
+        with os.scandir(dir) as it:
+            for entry in it:
+                if entry.is_dir():
+                    dirs.append(entry)
+                elif entry.is_file():
+                    files.append(entry)
+        for entry in sorted(dirs, key=lambda entry: entry.name):
+            node.entries[entry.name] = self._read_dir(entry.path)
+        for entry in sorted(files, key=lambda entry: entry.name):
+            if self._capacity is None:
+                with open(entry.path, 'rb') as f:
+                    node.entries[entry.name] = _FileNode(f.read(), dirty=False)
+                continue
+
+            # The file on disk serves as spill file until the data is changed
+            child = _FileNode(dirty=False)
+            child._size = entry.stat().st_size
+            child.spill = os.path.abspath(entry.path)
+            self._spilled += child._size
+            node.entries[entry.name] = child
+        return node
+
+    def _write_dir(self, dir, node, dirty_only):
+        from .io import mkdirs, copy_file, _write_file
+        mkdirs(dir)
+        for name, child in node.entries.items():
+            filename = os.path.join(dir, name)
+            if isinstance(child, _DirNode):
+                self._write_dir(filename, child, dirty_only)
+                continue
+            if dirty_only and not child.dirty:
+                continue
+
+            with self._lock:
+                if child.resident():
+                    data = self._data(child)
+                    _write_file(filename, data, binary=not isinstance(data, str))
+                elif child.spill != os.path.abspath(filename):
+                    copy_file(child.spill, filename)
+                child.dirty = False
+
+    #
+    # ----------- Capacity -----------
+    #
+    def _new_spill_file(self):
+        if self._spill_dir is None:
+            if self._spill_base is not None:
+                os.makedirs(self._spill_base, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix="itypes-spill-", dir=self._spill_base)
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        self._spill_counter += 1
+        return os.path.join(self._spill_dir, "%08d" % self._spill_counter)
+
+    def _drop_spill(self, node):
+        if node.spill is None:
+            return
+        if not node.resident():
+            self._spilled -= node._size
+        if node.spill_owned and os.path.exists(node.spill):
+            os.remove(node.spill)
+        node.spill = None
+        node.spill_owned = False
+
+    def _spill(self, node):
+        if node.spill is None:
+            data = node._data
+            node.spill = self._new_spill_file()
+            node.spill_owned = True
+            node.spill_text = isinstance(data, str)
+            with open(node.spill, 'wb') as f:
+                f.write(data.encode() if node.spill_text else data)
+        node._data = None
+        self._resident -= node._size
+        self._spilled += node._size
+        self._spills += 1
+
+    def _enforce(self):
+        while self._resident > self._capacity and len(self._lru):
+            node, _ = self._lru.popitem(last=False)
+            self._spill(node)
+
+    def _set(self, node, data):
+        with self._lock:
+            if self._capacity is not None:
+                self._drop_spill(node)
+                if self._lru.pop(node, False) is None:
+                    self._resident -= node._size
+            node.set_data(data)
+            if self._capacity is not None:
+                self._lru[node] = None
+                self._resident += node._size
+                self._enforce()
+
+    def _data(self, node):
+        if node._stream is not None:
+            return node._stream.getvalue()
+        if self._capacity is None:
+            return node._data
+
+        with self._lock:
+            data = node._data
+            if data is not None:
+                self._lru.move_to_end(node)
+                return data
+            if node.spill is None:
+                return None
+
+            with open(node.spill, 'rb') as f:
+                data = f.read()
+            if node.spill_text:
+                data = data.decode()
+            node._data = data
+            self._spilled -= node._size
+            self._resident += node._size
+            self._reloads += 1
+            self._lru[node] = None
+            self._enforce()
+            return data
+
+    def _forget(self, node):
+        # Releases the data of a removed file
+        with self._lock:
+            if self._lru.pop(node, False) is None:
+                self._resident -= node._size
+            self._drop_spill(node)
+
+    def _clear(self):
+        for node in list(_file_nodes(self._root)):
+            self._forget(node)
+
+    def stats(self):
+        return {
+            "capacity": self._capacity,
+            "resident_bytes": self._resident if self._capacity is not None else sum(node.size() for node in _file_nodes(self._root)),
+            "spilled_bytes": self._spilled,
+            "spills": self._spills,
+            "reloads": self._reloads,
+        }
+
+    #
+    # ----------- Mounting -----------
+    #
     def mount(self, mountpoint):
         self.unmount()
         if mountpoint is None:
             return
+        mountpoint = str(mountpoint)
+        if len(mountpoint) > 1:
+            mountpoint = mountpoint.rstrip('/')
         self._mountpoint = mountpoint
+        self._prefix = mountpoint if mountpoint.endswith('/') else mountpoint + '/'
         self._register()
         return self
 
     def unmount(self):
-        self._mountpoint = '/'
         self._unregister()
+        self._mountpoint = '/'
+        self._prefix = '/'
         return self
 
+    def mountpoint(self):
+        return self._mountpoint
+
     def includes(self, path):
         path = str(path)
-        if path.startswith(self._mountpoint):
-            return True
-        return False
-
-    def mkdir(self, path):
-        pass
+        return path == self._mountpoint or path.startswith(self._prefix)
 
     def _register(self):
         from .io import register_file_system
@@ -160,33 +340,111 @@ class MemoryFileSystem:
         unregister_file_system(self)
         return self
 
+    #
+    # ----------- Lookup -----------
+    #
+    def _parts(self, path):
+        path = str(path)
+        if path == self._mountpoint:
+            local = ''
+        elif path.startswith(self._prefix):
+            local = path[len(self._prefix):]
+        else:
+            raise KeyError(path)
+
+        parts = []
+        for part in local.split('/'):
+            if part == '' or part == '.':
+                continue
+            if part == '..':
+                if len(parts): parts.pop()
+                continue
+            parts.append(part)
+        return parts
+
+    def _find(self, parts):
+        node = self._root
+        for part in parts:
+            if not isinstance(node, _DirNode):
+                return None
+            node = node.entries.get(part)
+            if node is None:
+                return None
+        return node
+
+    def _dir(self, path, parts, create=False):
+        node = self._root
+        for part in parts:
+            child = node.entries.get(part)
+            if child is None:
+                if not create:
+                    raise FileNotFoundError(str(path))
+                child = _DirNode()
+                node.entries[part] = child
+            elif not isinstance(child, _DirNode):
+                raise NotADirectoryError(str(path))
+            node = child
+        return node
+
+    def _file(self, path, create=False):
+        parts = self._parts(path)
+        if len(parts) == 0:
+            raise IsADirectoryError(str(path))
+        dir = self._dir(path, parts[:-1], create=create)
+        node = dir.entries.get(parts[-1])
+        if node is None:
+            if not create:
+                raise FileNotFoundError(str(path))
+            node = _FileNode()
+            dir.entries[parts[-1]] = node
+        elif isinstance(node, _DirNode):
+            raise IsADirectoryError(str(path))
+        return node
+
+    #
+    # ----------- Access -----------
+    #
     def __getitem__(self, file):
-        file = str(file)
-
-        if not file.startswith(self._mountpoint):
-            raise KeyError(file)
-        local_path = file.replace(self._mountpoint, '')
-
-        parts = local_path.split('/')
-        data = _lookup(self._entries, parts[1:]).data()
-        return data
+        node = self._find(self._parts(file))
+        if node is None:
+            raise KeyError(str(file))
+        if isinstance(node, _DirNode):
+            raise IsADirectoryError(str(file))
+        return self._data(node)
 
     def __contains__(self, file):
-        try:
-            data = self[file]
-        except KeyError:
+        if not self.includes(file):
             return False
-        return True
+        return self._find(self._parts(file)) is not None
 
     def __setitem__(self, file, data):
-        file = str(file)
-
-        if not file.startswith(self._mountpoint):
-            raise KeyError(file)
-        local_path = file.replace(self._mountpoint, '')
+        self._set(self._file(file, create=True), _to_data(data))
 
-        parts = local_path.split('/')
-        _write_memory(self._entries, parts[1:], _DataItem(data))
+    def open(self, file, mode):
+        if 'w' in mode:
+            if 'a' in mode:
+                raise NotImplementedError
+            node = self._file(file, create=True)
+            stream = _BytesWriter(self, node) if 'b' in mode else _TextWriter(self, node)
+            node._stream = stream
+            return stream
+
+        if 'r' not in mode:
+            raise NotImplementedError
+
+        data = self._data(self._file(file))
+        if 'b' in mode:
+            return io.BytesIO(data.encode() if isinstance(data, str) else data)
+        return io.StringIO(data if isinstance(data, str) else bytes(data).decode())
+
+    def buffer(self, file):
+        """ buffer(file):
+        Returns a read-only memoryview of the stored data without copying it
+        """
+        data = self._data(self._file(file))
+        if isinstance(data, str):
+            data = data.encode()
+        return memoryview(data)
 
     def read(self, file):
         file = File(file)
@@ -196,17 +454,74 @@ class MemoryFileSystem:
         file = File(file)
         self[file] = data
 
-    def write_to_disk(self, path):
-        path = Path(path)
-        _write(path, self._entries)
+    def exists(self, path):
+        return path in self
+
+    def is_dir(self, path):
+        if not self.includes(path):
+            return False
+        return isinstance(self._find(self._parts(path)), _DirNode)
+
+    def mkdir(self, path):
+        self._dir(path, self._parts(path), create=True)
+
+    def sync(self):
         return self
 
+    def remove(self, path):
+        parts = self._parts(path)
+        if len(parts) == 0:
+            self._clear()
+            self._root = _DirNode()
+            return
+        dir = self._find(parts[:-1])
+        if not isinstance(dir, _DirNode) or parts[-1] not in dir.entries:
+            raise FileNotFoundError(str(path))
+        node = dir.entries.pop(parts[-1])
+        if isinstance(node, _DirNode):
+            for child in list(_file_nodes(node)):
+                self._forget(child)
+        else:
+            self._forget(node)
+
+    def scandir(self, path):
+        """ scandir(path):
+        Returns the names of the files and of the directories in path
+        """
+        node = self._dir(path, self._parts(path))
+        files = []
+        dirs = []
+        for name, child in node.entries.items():
+            if isinstance(child, _DirNode): dirs.append(name)
+            else:                           files.append(name)
+        return files, dirs
+
+    def stat(self, path):
+        node = self._find(self._parts(path))
+        if node is None:
+            raise FileNotFoundError(str(path))
+        if isinstance(node, _DirNode):
+            mode, size = stat.S_IFDIR | 0o755, 0
+        else:
+            mode, size = stat.S_IFREG | 0o644, node.size()
+        return os.stat_result((mode, 0, 0, 1, 0, 0, size, node.mtime, node.mtime, node.mtime))
+
+    def list_dirs(self, path=None):
+        path = Path(path if path is not None else self._mountpoint)
+        files, dirs = self.scandir(path)
+        return [path.cd(name) for name in sorted(dirs)]
+
+    def list_files(self, path=None):
+        path = Path(path if path is not None else self._mountpoint)
+        files, dirs = self.scandir(path)
+        return [path.file(name) for name in sorted(files)]
+
     def __str__(self):
         str = ""
-        for entry, value in self._entries.items():
-            if isinstance(value, OrderedDict):
+        for entry, value in self._root.entries.items():
+            if isinstance(value, _DirNode):
                 str += f"DIR  {' '*8} {entry}"
             else:
-                str += f"FILE {len(value):8d} {entry}"
+                str += f"FILE {value.size():8d} {entry}"
             str += "\n"
-        return str
\ No newline at end of file
+        return str
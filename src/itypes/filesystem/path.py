@@ -9,9 +9,11 @@
 
 import os
 import re
-import shutil
-from copy import deepcopy
+from fnmatch import translate
+from multiprocessing.dummy import Pool as ThreadPool
 from .helper import split_path, mkdirs
+from .io import _filesystems, _find_file_system
+from ..type import is_list
 
 
 rx_id = re.compile(r'\d+')
@@ -24,19 +26,105 @@ def abspath(path):
     return os.path.abspath(path)
 
 
+def _normal(parts):
+    # True if '/'.join(parts) is left unchanged by os.path.normpath()
+    if len(parts) == 0:
+        return False
+    start = 1 if parts[0] == '' else 0
+    if start == len(parts):
+        return False
+    leading = start == 0
+    for part in parts[start:]:
+        if part == '..':
+            if not leading: return False
+        else:
+            leading = False
+            if part == '' or part == '.': return False
+    return True
+
+
+def _compile_patterns(patterns):
+    # Comma separated wildcard patterns (see wildcard_match) as one regex
+    needles = []
+    for pattern in patterns:
+        needles += pattern.split(',') if not is_list(pattern) else pattern
+    if len(needles) == 0:
+        return None
+    return re.compile('|'.join(translate(needle) for needle in needles)).match
+
+
+def _scan_dir(dir, match, fs=None):
+    files = []
+    dirs = []
+    if fs is not None:
+        try:
+            files, dirs = fs.scandir(abspath(dir if dir != '' else '.'))
+        except FileNotFoundError:
+            pass
+        if match is not None:
+            files = [name for name in files if match(name)]
+    else:
+        _scan_os_dir(dir, match, files, dirs)
+    files.sort()
+    dirs.sort()
+    return files, dirs
+
+
+def _scan_os_dir(dir, match, files, dirs):
+    try:
+        with os.scandir(dir if dir != '' else '.') as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.is_file() and (match is None or match(entry.name)):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        # Removed while walking
+        pass
+
+
+def _make_path(parts):
+    path = Path.__new__(Path)
+    path._parts = parts
+    path._str = '/'.join(parts)
+    path._abs = None
+    return path
+
+
 class Path:
+    """
+    Immutable directory path. The string form is computed once and abs() is
+    cached (per working directory for relative paths), derived paths are
+    built from the parts without parsing again.
+    """
+
+    __slots__ = ("_parts", "_str", "_abs")
+
     def __init__(self, path=None, absolute=False):
         if path is None:
             path = ''
         if isinstance(path, Path):
-            path = path.str()
+            if not absolute:
+                self._parts = path._parts
+                self._str = path._str
+                self._abs = path._abs
+                return
+            path = path._str
         if absolute:
             path = abspath(str(path))
 
-        self._parts = split_path(path)
+        self._parts = tuple(split_path(path))
+        self._str = '/'.join(self._parts)
+        self._abs = None
+
+    def __reduce__(self):
+        return (_make_path, (self._parts,))
 
     def clone(self):
-        return deepcopy(self)
+        return self
 
     def name(self):
         return self._parts[-1]
@@ -54,40 +142,87 @@ class Path:
         return is_dir(self.abs().str())
 
     def empty(self):
+        fs = self._file_system()
+        if fs is not None:
+            files, dirs = fs.scandir(self.abs().str())
+            return len(files) + len(dirs) == 0
         return len(os.listdir(self.str())) == 0
 
     def remove(self):
+        from .io import remove_dir
         if self.exists():
-            shutil.rmtree(str(self.abs()))
+            remove_dir(str(self.abs()))
+
+    def _file_system(self):
+        # The absolute path is only needed if filesystems are registered
+        if len(_filesystems) == 0:
+            return None
+        return _find_file_system(self.abs().str())
 
     def cd(self, *parts):
-        n = self.clone()
+        new_parts = self._parts
         for part in parts:
             if isinstance(part, Path):
-                n._parts += part._parts
+                new_parts += part._parts
             else:
-                more_parts = split_path(part)
-                n._parts += more_parts
-        return n
-
-    def search_files(self, *patterns):
-        result = []
-        for file in self.list_files():
-            for pattern in patterns:
-                if file.matches(pattern):
-                    result.append(file)
-        for dir in self.list_dirs():
-            result += dir.search_files(*patterns)
-        return result
+                new_parts += tuple(split_path(part))
+        return _make_path(new_parts)
+
+    def iter_files(self, *patterns, prune=None, num_threads=None):
+        """ iter_files(*patterns, prune=None, num_threads=None):
+        Yields the files below this path whose names match one of the patterns (all files if none are given),
+        directories are visited depth-first in sorted order. Directories are skipped if their name matches
+        the pattern prune or if prune is a function and returns True for their Path. With num_threads > 1
+        the directories are scanned ahead by a thread pool, e.g. for network filesystems.
+        """
+        if not self.exists():
+            raise FileNotFoundError(self.str())
+
+        match = _compile_patterns(patterns)
+        fs = self._file_system()
+        prune_name = None
+        if prune is not None and not callable(prune):
+            prune_name = _compile_patterns([prune])
+            prune = None
+
+        pool = ThreadPool(num_threads) if num_threads is not None and num_threads > 1 else None
+
+        def scan(path):
+            if pool is None:
+                return path, None
+            return path, pool.apply_async(_scan_dir, (path._str, match, fs))
+
+        try:
+            stack = [scan(self if self._str != '' else Path('.'))]
+            while len(stack):
+                path, result = stack.pop()
+                files, dirs = result.get() if result is not None else _scan_dir(path._str, match, fs)
+                for name in files:
+                    yield _file._make_file(name, path)
+
+                children = []
+                for name in dirs:
+                    if prune_name is not None and prune_name(name):
+                        continue
+                    child = _make_path(path._parts + (name,))
+                    if prune is not None and prune(child):
+                        continue
+                    children.append(scan(child))
+                stack += reversed(children)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def search_files(self, *patterns, prune=None, num_threads=None):
+        return list(self.iter_files(*patterns, prune=prune, num_threads=num_threads))
 
     def list_dirs(self, pattern=None):
         if not self.exists():
             raise FileNotFoundError(self.str())
 
-        dir = self.str()
-        if dir == '': dir = '.'
-        list_dirs = sorted([f.path for f in os.scandir(dir) if f.is_dir()])
-        list = [Path(p) for p in list_dirs]
+        root = self if self._str != '' else Path('.')
+        files, dirs = _scan_dir(root._str, None, self._file_system())
+        list = [_make_path(root._parts + (name,)) for name in dirs]
         if pattern is not None:
             rx = re.compile(pattern)
             new_list = []
@@ -98,15 +233,12 @@ class Path:
         return list
 
     def list_files(self, pattern=None):
-        from .file import File
-
         if not self.exists():
             raise FileNotFoundError(self.str())
 
-        dir = self.str()
-        if dir == '': dir = '.'
-        list_files = sorted([f.path for f in os.scandir(dir) if f.is_file()])
-        list = [File(p) for p in list_files]
+        root = self if self._str != '' else Path('.')
+        files, dirs = _scan_dir(root._str, None, self._file_system())
+        list = [_file._make_file(name, root) for name in files]
         if pattern is not None:
             rx = re.compile(pattern)
             new_list = []
@@ -129,28 +261,29 @@ class Path:
         return Path(os.path.relpath(abs_self, abs_other))
 
     def __add__(self, other):
-        from .file import File
-
         filename = None
-        if isinstance(other, File):
+        if isinstance(other, _file.File):
             filename = other.name()
             other = other.path()
 
         if not isinstance(other, Path):
             other = Path(other)
 
-        combined = Path(os.path.normpath(os.path.join(self.str(), other.str())))
+        parts = self._parts + other._parts
+        if self._str != '' and not other._str.startswith('/') and _normal(parts):
+            combined = _make_path(parts)
+        else:
+            combined = Path(os.path.normpath(os.path.join(self._str, other._str)))
         if filename is not None:
             return combined.file(filename)
         else:
             return combined
 
     def file(self, filename):
-        from .file import File
         """ new_file():
         E.g. Path('/a/b/f.e').new_file('y.z') returns '/a/b/y.z'
         """
-        return File(path=self, name=filename)
+        return _file.File(filename, self)
 
     def part(self, idx):
         """ sub(idx):
@@ -159,13 +292,31 @@ class Path:
         return self._parts[idx]
 
     def parts(self):
-        return self._parts
+        return list(self._parts)
 
     def abs(self):
-        return Path(abspath(self.str()))
+        cache = self._abs
+        if cache is True:
+            return self
+
+        if self._str.startswith('/'):
+            if _normal(self._parts):
+                self._abs = True
+                return self
+            cwd = None
+        else:
+            cwd = os.getcwd()
+        if cache is not None and cache[0] == cwd:
+            return cache[1]
+
+        path = Path(abspath(self._str))
+        if path._str.startswith('/'):
+            path._abs = True
+        self._abs = (cwd, path)
+        return path
 
     def str(self):
-        return '/'.join(self._parts)
+        return self._str
 
     def str_index(self):
         """ str_id():
@@ -184,10 +335,16 @@ class Path:
         return int(x)
 
     def __eq__(self, other):
-        return self.str() == other.str()
+        return self._str == other.str()
+
+    def __hash__(self):
+        return hash(self._str)
 
     def __str__(self):
-        return self.str()
+        return self._str
 
 
 home = Path(os.path.join(os.getenv("HOME")))
+
+# Imported here as file.py imports Path
+from . import file as _file
@@ -10,10 +10,13 @@
 from .filesystem import File
 from copy import deepcopy
 from .type import FAIL
+from .profiler import profiler
 
 MAX_INT = 2**16 - 1
 
 class JsonRegistryNode:
+    __slots__ = ("_reg", "_path")
+
     def __init__(self, reg, path):
         self._reg = reg
         self._path = path
@@ -54,6 +57,8 @@ class JsonRegistryNode:
         return deepcopy(self._reg[self._path])
 
 class RegistryPath:
+    __slots__ = ("_path",)
+
     def __init__(self, *args):
         if len(args) == 1:
             arg = args[0]
@@ -68,10 +73,12 @@ class RegistryPath:
         return '/'.join(self._path)
 
     def copy(self):
-        return deepcopy(self)
+        copy = RegistryPath.__new__(RegistryPath)
+        copy._path = list(self._path)
+        return copy
 
     def path(self):
-        return deepcopy(self._path)
+        return list(self._path)
 
     def append(self, *args):
         copy = self.copy()
@@ -159,21 +166,38 @@ def _delitem(d, key):
         del d[current_key]
 
 class JsonRegistry(dict):
-    def __init__(self, file=None):
+    def __init__(self, file=None, readonly=False):
         self._file = file
         self._key_cache = {}
+        self._readonly = readonly
+
+    def readonly(self):
+        return self._readonly
+
+    def set_readonly(self, readonly=True):
+        self._readonly = readonly
+
+    def _check_writable(self, key):
+        if self._readonly:
+            raise Exception(f"cannot modify key {key} of read-only JSON registry")
 
     def to_dict(self):
         return dict(deepcopy(self))
 
+    def clear_cache(self):
+        self._key_cache = {}
+
     def from_dict(self, data):
+        self._check_writable("/")
         self.clear()
+        self.clear_cache()
         self.update(data)
 
     def read(self, file=None):
         if file is None:
             file = self._file
         self.clear()
+        self.clear_cache()
         self.update(File(file).read())
         self._file = file
 
@@ -199,6 +223,7 @@ class JsonRegistry(dict):
         return default
 
     def __setitem__(self, key, value):
+        self._check_writable(key)
         self._key_cache[str(key)] = value
         if '/' not in str(key):
             return super().__setitem__(str(key), value)
@@ -206,6 +231,7 @@ class JsonRegistry(dict):
         return _setitem(self, key, value)
 
     def remove(self, key):
+        self._check_writable(key)
         self._key_cache.pop(str(key), None)
         if '/' not in str(key):
             if not str(key) in self:
@@ -221,4 +247,8 @@ class JsonRegistry(dict):
         if '/' not in str(key):
             return super().__contains__(str(key))
         key = RegistryPath(key)
-        return _contains(self, key)
\ No newline at end of file
+        return _contains(self, key)
+
+profiler.instrument(JsonRegistry, "__getitem__", "JsonRegistry.get")
+profiler.instrument(JsonRegistry, "__setitem__", "JsonRegistry.set")
+profiler.instrument(JsonRegistry, "__contains__", "JsonRegistry.contains")
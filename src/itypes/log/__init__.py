@@ -9,5 +9,16 @@
 
 from .trace_logger import TraceLogger
 from .trace_logger import set_trace_level
+from .trace_logger import set_trace_sink
+
+from .sinks import StreamSink
+from .sinks import FileSink
+from .sinks import RingBufferSink
+from .sinks import AsyncSink
 
 from .info_logger import log
+from .info_logger import INFO
+from .info_logger import NOTICE
+from .info_logger import WARNING
+from .info_logger import ERROR
+from .info_logger import CONFIRMATION
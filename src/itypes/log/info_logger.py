@@ -7,8 +7,12 @@
 ### See https://github.com/eddy-ilg/itypes  ###
 ### --------------------------------------- ###
 
-import datetime
+import time
+import json
+import atexit
+import threading
 import termcolor
+from .sinks import StreamSink
 
 INFO = "INFO"
 NOTICE = "NOTICE"
@@ -24,26 +28,106 @@ _colors = {
     CONFIRMATION: "green"
 }
 
+_levels = {
+    INFO: 0,
+    NOTICE: 1,
+    CONFIRMATION: 2,
+    WARNING: 3,
+    ERROR: 4
+}
+
 class _InfoLogger:
-    def message(self, level, msg):
-        time_str = '{0:%Y-%m-%d %H:%M:%S} - '.format(datetime.datetime.now())
-        print(time_str, end='')
-        termcolor.cprint(f'{level+":":9s} {msg}', _colors[level])
+    def __init__(self):
+        self._level = _levels[INFO]
+        self._sink = StreamSink()
+        self._format = "text"
+        self._rate_limit = 100
+        self._counts = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+        self._time = None
+        self._time_str = None
 
-    def info(self, msg):
-        self.message(INFO, msg)
+    def set_level(self, level):
+        self._level = _levels[level]
 
-    def notice(self, msg):
-        self.message(NOTICE, msg)
+    def set_sink(self, sink):
+        self._sink = sink
 
-    def warning(self, msg):
-        self.message(WARNING, msg)
+    def set_format(self, format):
+        if format not in ["text", "json"]:
+            raise Exception(f"invalid log format: {format}")
+        self._format = format
 
-    def error(self, msg):
-        self.message(ERROR, msg)
+    def set_rate_limit(self, limit):
+        """ set_rate_limit(limit):
+        Keyed messages are emitted at most limit times per key until summarize() is called (None for no limit)
+        """
+        self._rate_limit = limit
 
-    def confirm(self, msg):
-        self.message(CONFIRMATION, msg)
+    def _timestamp(self):
+        # Formatting the time is only done once per second
+        now = int(time.time())
+        if now != self._time:
+            self._time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+            self._time = now
+        return self._time_str
 
-log = _InfoLogger()
+    def _allow(self, level, key):
+        if key is None or self._rate_limit is None:
+            return True
+        with self._lock:
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+            if count <= self._rate_limit:
+                return True
+            suppressed = self._suppressed.get(key)
+            if suppressed is None:
+                self._suppressed[key] = [level, 1]
+            else:
+                suppressed[1] += 1
+            return False
+
+    def message(self, level, msg, key=None):
+        if _levels[level] < self._level:
+            return
+        if not self._allow(level, key):
+            return
+
+        if self._format == "json":
+            entry = {"time": self._timestamp(), "level": level, "message": str(msg)}
+            if key is not None:
+                entry["key"] = key
+            line = json.dumps(entry)
+        else:
+            line = self._timestamp() + ' - ' + termcolor.colored(f'{level+":":9s} {msg}', _colors[level])
+        self._sink.write(line + '\n')
+
+    def summarize(self):
+        with self._lock:
+            suppressed, self._suppressed = self._suppressed, {}
+            self._counts = {}
+        for key, (level, count) in suppressed.items():
+            self.message(level, f"{count:,d} more \"{key}\" messages suppressed")
+
+    def flush(self):
+        self.summarize()
+        self._sink.flush()
 
+    def info(self, msg, key=None):
+        self.message(INFO, msg, key)
+
+    def notice(self, msg, key=None):
+        self.message(NOTICE, msg, key)
+
+    def warning(self, msg, key=None):
+        self.message(WARNING, msg, key)
+
+    def error(self, msg, key=None):
+        self.message(ERROR, msg, key)
+
+    def confirm(self, msg, key=None):
+        self.message(CONFIRMATION, msg, key)
+
+log = _InfoLogger()
+atexit.register(log.flush)
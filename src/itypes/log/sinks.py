@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+import sys
+import atexit
+import threading
+from queue import Queue
+from collections import deque
+
+
+class StreamSink:
+    """
+    Writes lines to a stream (sys.stdout by default). With buffer_lines > 1
+    lines are collected and written in one go.
+    """
+
+    def __init__(self, stream=None, buffer_lines=1):
+        self._stream = stream
+        self._buffer_lines = buffer_lines
+        self._buffer = []
+        self._lock = threading.Lock()
+        if buffer_lines > 1:
+            atexit.register(self.flush)
+
+    def stream(self):
+        # Resolve sys.stdout late so that redirections are respected
+        return self._stream if self._stream is not None else sys.stdout
+
+    def write(self, line):
+        if self._buffer_lines <= 1:
+            stream = self.stream()
+            stream.write(line)
+            stream.flush()
+            return
+
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self._buffer_lines:
+                return
+            lines, self._buffer = self._buffer, []
+        self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        stream = self.stream()
+        stream.write(''.join(lines))
+        stream.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if len(lines):
+            self._write_lines(lines)
+
+    def close(self):
+        self.flush()
+
+
+class FileSink(StreamSink):
+    def __init__(self, filename, buffer_lines=1000, mode="a"):
+        super().__init__(open(filename, mode), buffer_lines)
+        self._filename = filename
+
+    def close(self):
+        super().close()
+        self._stream.close()
+
+
+class RingBufferSink:
+    """
+    Keeps only the last capacity lines in memory, e.g. to dump them on error.
+    """
+
+    def __init__(self, capacity=10000):
+        self._lines = deque(maxlen=capacity)
+
+    def write(self, line):
+        self._lines.append(line)
+
+    def lines(self):
+        return list(self._lines)
+
+    def dump(self, stream=None):
+        if stream is None:
+            stream = sys.stdout
+        stream.write(''.join(self._lines))
+        stream.flush()
+
+    def clear(self):
+        self._lines.clear()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncSink:
+    """
+    Hands lines to a background thread which writes them to another sink.
+    """
+
+    def __init__(self, sink):
+        self._sink = sink
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            line = self._queue.get()
+            try:
+                if line is None:
+                    self._sink.flush()
+                else:
+                    self._sink.write(line)
+            finally:
+                self._queue.task_done()
+
+    def write(self, line):
+        self._queue.put(line)
+
+    def flush(self):
+        self._queue.put(None)
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._sink.close()
@@ -8,8 +8,8 @@
 ### --------------------------------------- ###
 
 import sys
-import inspect
-from itypes import addr
+from ..type import addr
+from .sinks import StreamSink
 
 TRACE = -1
 DEBUG = 0
@@ -25,6 +25,15 @@ def set_trace_level(level):
         level = str_to_level(level)
     log_level = level
 
+_sink = StreamSink()
+
+def set_trace_sink(sink):
+    global _sink
+    _sink = sink
+
+def trace_sink():
+    return _sink
+
 def str_to_level(str):
     if str == "TRACE": return TRACE
     if str == "DEBUG": return DEBUG
@@ -41,12 +50,18 @@ def level_to_str(level):
     if level == ERROR: return "ERROR"
     return "(unknown)"
 
+# Class metadata per code object of the method constructing the logger
+_container_info = {}
+
 class TraceLogger:
     def __init__(self):
-        info = inspect.stack()[1]
-        self._container = info.frame.f_locals["__class__"]
-        self._module_name = self._container.__module__
-        self._class_name = self._container.__name__
+        frame = sys._getframe(1)
+        info = _container_info.get(frame.f_code)
+        if info is None:
+            container = frame.f_locals["__class__"]
+            info = (container, container.__module__, container.__name__)
+            _container_info[frame.f_code] = info
+        self._container, self._module_name, self._class_name = info
 
     def _message(self, level, message):
         global log_level
@@ -54,15 +69,14 @@ class TraceLogger:
         if level < log_level:
             return
 
-        info = inspect.stack()[2]
-        object = info.frame.f_locals["self"]
-        function_name = info.function
+        frame = sys._getframe(2)
+        object = frame.f_locals.get("self")
+        function_name = frame.f_code.co_name
 
         str = ""
         str += f"[{level_to_str(level):>7s}] {self._module_name:40s} {self._class_name:25s} {addr(object):14s} {function_name+'()':30s}: {message}"
         str += "\n"
-        sys.stdout.write(str)
-        sys.stdout.flush()
+        _sink.write(str)
 
     def info(self, msg):
         self._message(INFO, msg)
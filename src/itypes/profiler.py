@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+import time
+import threading
+import functools
+
+
+class _Scope:
+    def __init__(self, profiler, key):
+        self._profiler = profiler
+        self._key = key
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._profiler.add(self._key, time.perf_counter() - self._start)
+
+
+class _ProfileContext:
+    def __init__(self, profiler, reset, report):
+        self._profiler = profiler
+        self._reset = reset
+        self._report = report
+
+    def __enter__(self):
+        self._was_enabled = self._profiler.enabled
+        if self._reset:
+            self._profiler.reset()
+        self._profiler.enabled = True
+        return self._profiler
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._profiler.enabled = self._was_enabled
+        if self._report:
+            self._profiler.report()
+
+
+class Profiler:
+    """
+    Counters and timers for the io and dataset hot paths.
+
+    Instrumented code only checks profiler.enabled while profiling is off.
+    Methods registered with instrument() are only replaced by timed wrappers
+    while profiling is on, so they don't cost anything otherwise.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._instrumented = []
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
+        for cls, name, key, func in self._instrumented:
+            setattr(cls, name, self._timed(key, func) if enabled else func)
+
+    def instrument(self, cls, name, key):
+        """ instrument(cls, name, key):
+        Times the method cls.name under key while profiling is enabled
+        """
+        func = cls.__dict__[name]
+        self._instrumented.append((cls, name, key, func))
+        if self._enabled:
+            setattr(cls, name, self._timed(key, func))
+
+    def _timed(self, key, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(key, func, *args, **kwargs)
+        return wrapper
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+
+    def add(self, key, seconds, count=1):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [count, seconds]
+            else:
+                entry[0] += count
+                entry[1] += seconds
+
+    def count(self, key, count=1):
+        self.add(key, 0.0, count)
+
+    def scope(self, key):
+        return _Scope(self, key)
+
+    def call(self, key, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.add(key, time.perf_counter() - start)
+
+    def to_dict(self):
+        with self._lock:
+            return {key: {"count": count, "seconds": seconds} for key, (count, seconds) in self._entries.items()}
+
+    def str(self):
+        entries = sorted(self.to_dict().items(), key=lambda x: -x[1]["seconds"])
+        str = f"{'key':40s} {'count':>10s} {'total':>10s} {'mean':>12s}\n"
+        for key, entry in entries:
+            count, seconds = entry["count"], entry["seconds"]
+            mean = seconds / count * 1e6 if count else 0
+            str += f"{key:40s} {count:10d} {seconds:9.4f}s {mean:10.2f}us\n"
+        return str
+
+    def report(self):
+        from .log import log
+        log.info("Profile:\n" + self.str())
+
+    def __str__(self):
+        return self.str()
+
+
+profiler = Profiler()
+
+
+def profile(reset=True, report=True):
+    """ profile():
+    E.g. 'with profile(): ds.write()' prints the collected counters and timers on exit
+    """
+    return _ProfileContext(profiler, reset, report)
+
+
+def profiled(key):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            return profiler.call(key, func, *args, **kwargs)
+        return wrapper
+    return decorator
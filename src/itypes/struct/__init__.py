@@ -13,4 +13,6 @@ from .helper import KeyPath
 
 from .struct import Struct
 from .numpy_struct import NumpyStruct
-from .torch_struct import TorchStruct
\ No newline at end of file
+from .torch_struct import TorchStruct
+
+from .collator import BatchCollator
\ No newline at end of file
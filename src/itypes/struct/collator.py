@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+from .helper import _layout_nodes
+
+
+def _spec(struct, x):
+    if not struct._is_data(x) or len(x.shape) == 0:
+        return None
+    return (type(x), tuple(x.shape), x.dtype, getattr(x, 'device', None))
+
+
+class BatchCollator:
+    """
+    Collates structs into batches like DataStruct.concat_batch(), but copies
+    the data into buffers which are allocated from the shapes and dtypes of
+    the first sample and reused for later batches of the same layout.
+
+    The buffers are handed out in turn, i.e. a returned batch is overwritten
+    num_buffers batches later. Keys whose shapes or dtypes differ between
+    samples are returned as lists.
+    """
+
+    def __init__(self, num_buffers=2, pin_memory=False):
+        self._num_buffers = num_buffers
+        self._pin_memory = pin_memory
+        self._key = None
+        self._buffers = []
+        self._next = 0
+        self._batch = None
+
+    def reset(self):
+        self._key = None
+        self._buffers = []
+        self._next = 0
+        self._batch = None
+
+    def prepare(self, template, batch_size):
+        """ prepare(template, batch_size):
+        Selects the buffers for the next batch, the slots are filled with write() or through slot()
+        """
+        layout, nodes = _layout_nodes(template)
+        leaves = [nodes[node] for node in layout.leaf_nodes]
+        specs = tuple(_spec(template, x) for x in leaves)
+
+        key = (layout, specs, batch_size)
+        if key != self._key:
+            self.reset()
+            self._key = key
+
+        if len(self._buffers) < self._num_buffers:
+            buffers = []
+            for x, spec in zip(leaves, specs):
+                if spec is None:
+                    buffers.append(None)
+                    continue
+                shape = (batch_size * spec[1][0],) + spec[1][1:]
+                buffers.append(template._data_empty(x, shape, self._pin_memory))
+            self._buffers.append(buffers)
+        buffers = self._buffers[self._next]
+        self._next = (self._next + 1) % self._num_buffers
+
+        self._batch = {
+            "template": template,
+            "layout": layout,
+            "nodes": nodes,
+            "specs": specs,
+            "buffers": buffers,
+            # (index, node, spec..., buffer, rows per sample) of the data leaves for write() and collate()
+            "data": [(i, node) + spec + (buffers[i], spec[1][0])
+                     for i, (node, spec) in enumerate(zip(layout.leaf_nodes, specs)) if spec is not None],
+            "members": [[None if spec is not None else x] * batch_size for x, spec in zip(leaves, specs)],
+            "ragged": [False] * len(leaves),
+            "size": batch_size
+        }
+        return self
+
+    def _slice(self, i, idx):
+        spec = self._batch["specs"][i]
+        n = spec[1][0]
+        return self._batch["buffers"][i][idx * n:(idx + 1) * n]
+
+    def slot(self, idx):
+        """ slot(idx):
+        Returns a struct whose arrays are views into the buffers for sample idx
+        """
+        batch = self._batch
+        layout = batch["layout"]
+        values = []
+        for i, x in enumerate(batch["nodes"][node] for node in layout.leaf_nodes):
+            if batch["specs"][i] is None:
+                values.append(x)
+            else:
+                values.append(self._slice(i, idx))
+        return layout.build(batch["nodes"], values)[0]
+
+    def write(self, idx, sample):
+        batch = self._batch
+        layout = batch["layout"]
+        nodes = layout.match(sample)
+        if nodes is None:
+            raise Exception("BatchCollator.write() sample layout does not match the batch")
+
+        members = batch["members"]
+        for i, node in enumerate(layout.leaf_nodes):
+            members[i][idx] = nodes[node]
+
+        ragged = batch["ragged"]
+        copy = batch["template"]._data_copy
+        for i, node, data_type, shape, dtype, device, buffer, n in batch["data"]:
+            if ragged[i]:
+                continue
+            x = nodes[node]
+            if type(x) is not data_type or x.shape != shape or x.dtype != dtype or \
+                    (device is not None and x.device != device):
+                ragged[i] = True
+                continue
+            copy(buffer[idx * n:(idx + 1) * n], x)
+
+    def batch(self):
+        batch = self._batch
+        layout = batch["layout"]
+        values = []
+        for i, path in enumerate(layout.paths):
+            members = batch["members"][i]
+            if path[-1] == 'dims':
+                for member in members:
+                    if member != members[0]:
+                        raise Exception("BatchCollator tensor dims don't agree")
+                values.append(members[0])
+            elif batch["specs"][i] is None or batch["ragged"][i]:
+                values.append(members)
+            else:
+                values.append(batch["buffers"][i])
+        return layout.build(batch["nodes"], values)[0]
+
+    def collate(self, samples):
+        self.prepare(samples[0], len(samples))
+        batch = self._batch
+        layout = batch["layout"]
+        sample_nodes = []
+        for sample in samples:
+            nodes = layout.match(sample)
+            if nodes is None:
+                raise Exception("BatchCollator.collate() sample layout does not match the first sample")
+            sample_nodes.append(nodes)
+
+        members = batch["members"]
+        for i, node in enumerate(layout.leaf_nodes):
+            members[i] = [nodes[node] for nodes in sample_nodes]
+
+        # All samples are at hand, so each key is copied into its buffer in one go
+        ragged = batch["ragged"]
+        copy_batch = batch["template"]._data_copy_batch
+        for i, node, data_type, shape, dtype, device, buffer, n in batch["data"]:
+            xs = members[i]
+            if all(type(x) is data_type and x.shape == shape and x.dtype == dtype and
+                   (device is None or x.device == device) for x in xs):
+                copy_batch(buffer, xs)
+            else:
+                ragged[i] = True
+        return self.batch()
+
+    def __call__(self, samples):
+        return self.collate(samples)
@@ -9,7 +9,57 @@
 
 from ..type import is_list, is_dict
 from .struct import Struct
-from .helper import _common_keys
+from .helper import _common_keys, _layout_nodes, KeyPath
+
+
+class _BatchView:
+    __slots__ = ("_root", "_struct", "_index")
+
+    def __init__(self, root, struct, index):
+        self._root = root
+        self._struct = struct
+        self._index = index
+
+    def __getitem__(self, key):
+        if isinstance(key, KeyPath):
+            value = key.get(self._struct)
+        else:
+            value = self._struct[key]
+        if is_dict(value):
+            return _BatchView(self._root, value, self._index)
+        return self._root._extract_batch(value, self._index)
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def __contains__(self, key):
+        return key in self._struct
+
+    def __iter__(self):
+        return iter(self._struct)
+
+    def __len__(self):
+        return len(self._struct)
+
+    def keys(self):
+        return self._struct.keys()
+
+    def values(self):
+        return [self[key] for key in self._struct.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self._struct.keys()]
+
+    def struct(self):
+        layout, nodes = _layout_nodes(self._struct, lists=False)
+        values = [self._root._extract_batch(nodes[node], self._index) for node in layout.leaf_nodes]
+        return layout.build(nodes, values)[0]
+
+    def __str__(self):
+        return str(self.struct())
 
 
 class DataStruct(Struct):
@@ -100,6 +150,31 @@ class DataStruct(Struct):
         return self.translate_data(_to_bchw, dims="bchw")
 
     def concat_batch(self, inputs):
+        layout, nodes = _layout_nodes(inputs[0])
+        others = []
+        for input in inputs[1:]:
+            other_layout, other_nodes = _layout_nodes(input)
+            if other_layout is not layout:
+                return self._concat_batch_keys(inputs)
+            others.append([other_nodes[node] for node in layout.leaf_nodes])
+        leaves = [nodes[node] for node in layout.leaf_nodes]
+
+        values = []
+        for i, (path, value) in enumerate(zip(layout.paths, leaves)):
+            members = [value] + [other[i] for other in others]
+            if path[-1] == 'dims':
+                for member in members:
+                    if member != value:
+                        raise Exception("concat_batch() tensor dims don't agree")
+                values.append(value)
+            elif self._is_data(value):
+                values.append(self._concat_data(members))
+            else:
+                values.append(members)
+
+        return layout.build(nodes, values)[0]
+
+    def _concat_batch_keys(self, inputs):
         flat_keys = _common_keys(inputs)
 
         result = inputs[0].create_empty()
@@ -121,51 +196,76 @@ class DataStruct(Struct):
 
         return result
 
-    def split_batch(self):
-        # Determine batch size
+    def _batch_size(self):
         batch_size = None
-        def _test_bs(x):
-            nonlocal batch_size
+        for x in _layout_nodes(self)[1]:
+            if not self._is_data(x):
+                continue
             new_batch_size = x.shape[0]
             if batch_size is not None and batch_size != new_batch_size:
                 raise Exception(f"split_batch() found inconsistent batch dimensions {batch_size} and {new_batch_size}")
             batch_size = new_batch_size
-        self.apply_data(_test_bs)
 
         if batch_size is None:
             raise Exception('split_batch() could not find any batch dimension')
+        return batch_size
 
-        # Extract structures for each batch entry
-        result = []
-        for idx in range(0, batch_size):
-            def _extract_batch(x):
-                nonlocal idx
-                if self._is_data(x):
-                    if len(x.shape) == 4:
-                        exp = self._data_expand_dims(x[idx, ...])
-                        return exp
-                elif is_list(x):
-                    return x[idx]
-                else:
-                    return x
-
-            def _translate(x):
-                if is_dict(x):
-                    if hasattr(x, 'clone_type'): y = x.clone_type()
-                    else:                        y = type(x)()
-                    for key, value in x.items():
-                        y[key] = _translate(value)
-                else:
-                    y = _extract_batch(x)
-                return y
-
-            entry = _translate(self)
-            result.append(entry)
+    def _extract_batch(self, x, idx):
+        if self._is_data(x):
+            if len(x.shape) == 4:
+                # Slicing keeps the batch dimension and returns a view
+                return x[idx:idx + 1]
+            return None
+        elif is_list(x):
+            return x[idx]
+        else:
+            return x
 
-        return result
+    def split_batch(self):
+        return list(self.iter_batch())
+
+    def iter_batch(self):
+        """ iter_batch():
+        Like split_batch(), but creates the structures for each batch entry on demand
+        """
+        batch_size = self._batch_size()
+
+        # Lists are split like tensors, so they are leaves here
+        layout, nodes = _layout_nodes(self, lists=False)
+        leaves = [nodes[node] for node in layout.leaf_nodes]
+
+        def _iterate():
+            for idx in range(0, batch_size):
+                values = [self._extract_batch(x, idx) for x in leaves]
+                yield layout.build(nodes, values)[0]
+        return _iterate()
+
+    def batch_view(self, idx):
+        """ batch_view(idx):
+        Returns a read-only view of batch entry idx, members are only extracted on access
+        """
+        batch_size = self._batch_size()
+        if idx < 0:
+            idx += batch_size
+        if idx < 0 or idx >= batch_size:
+            raise IndexError(idx)
+        return _BatchView(self, self, idx)
+
+    def batch_views(self):
+        return [_BatchView(self, self, idx) for idx in range(0, self._batch_size())]
 
     def _is_data(self, x): raise NotImplementedError
     def _data_nan_to_num(self, x): raise NotImplementedError
     def _concat_data(self, x): raise NotImplementedError
     def _data_expand_dims(self, x): raise NotImplementedError
     def _data_permute_dims(self, x, dims): return NotImplementedError
+    def _data_empty(self, x, shape, pin_memory=False): raise NotImplementedError
+    def _data_copy(self, dst, src): raise NotImplementedError
+
+    def _data_copy_batch(self, dst, srcs):
+        # Copies srcs one after the other into dst along the batch dimension
+        pos = 0
+        for src in srcs:
+            n = src.shape[0]
+            self._data_copy(dst[pos:pos + n], src)
+            pos += n
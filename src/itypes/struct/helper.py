@@ -7,6 +7,7 @@
 ### See https://github.com/eddy-ilg/itypes  ###
 ### --------------------------------------- ###
 
+from copy import deepcopy
 from ..type import is_dict, is_list, is_numpy, is_torch, is_value, is_str
 
 
@@ -109,36 +110,27 @@ class KeyPath(list):
         return len(self) == 0
 
     def append_back(self, value):
-        subpath = KeyPath()
-        for x in self:
-            subpath.append(x)
+        subpath = KeyPath(self)
         subpath.append(value)
         return subpath
 
     def remove_first(self):
-        subpath = KeyPath()
-        for x in self[1:]:
-            subpath.append(x)
-        return subpath
+        return KeyPath(self[1:])
 
     def get(self, struct):
-        if len(self) == 1:
-            return struct[self[0].value]
-
-        sub_path = self.remove_first()
-        return sub_path.get(struct[self[0].value])
+        for key in self:
+            struct = struct[key.value]
+        return struct
 
     def set(self, struct, value):
-        if len(self) == 1:
-            if is_list(struct) and self[0].value >= len(struct):
-                struct.append(self[0].value)
-            else:
-                struct[self[0].value] = value
-            return
+        for key in self[:-1]:
+            struct = struct[key.value]
 
-        sub_path = self.remove_first()
-        struct = struct[self[0].value]
-        return sub_path.set(struct, value)
+        key = self[-1].value
+        if is_list(struct) and key >= len(struct):
+            struct.append(key)
+        else:
+            struct[key] = value
 
 
 class DictKey:
@@ -187,22 +179,267 @@ def _flatten(x, path, result):
         result[str(path)] = x
 
 def _common_keys(structs, subset=False):
-    flat_keys = [s.flat_keys() for s in structs]
+    layouts = [_layout(s) for s in structs]
+    if all(layout is layouts[0] for layout in layouts):
+        # The keys of the cached layout are shared, callers get their own copies
+        return [KeyPath(key) for key in layouts[0].keys]
+
+    path_sets = [set(layout.paths) for layout in layouts]
     common_keys = []
-    for key in flat_keys[0]:
+    for key, path in zip(layouts[0].keys, layouts[0].paths):
         found = True
-        for s in structs:
-            if key not in s:
+        for paths in path_sets:
+            if path not in paths:
                 found = False
                 break
         if found:
-            common_keys.append(key)
+            common_keys.append(KeyPath(key))
         else:
             if not subset:
                 raise Exception(f"Key '{key}' is not provided by all structs")
 
     return common_keys
 
+_DICT = 0
+_LIST = 1
+
+def _signature(x, lists, nodes):
+    # Leaves have signature None, containers a tuple of their kind and children.
+    # All nodes are collected in depth-first order on the way.
+    nodes.append(x)
+    if isinstance(x, dict):
+        return (_DICT,) + tuple([(key, _signature(value, lists, nodes)) for key, value in x.items()])
+    if lists and isinstance(x, (list, tuple)):
+        return (_LIST,) + tuple([_signature(value, lists, nodes) for value in x])
+    return None
+
+def _new_container(x):
+    if is_dict(x):
+        if hasattr(x, 'clone_type'): return x.clone_type()
+        else:                        return type(x)()
+    return []
+
+def _match(x, container, containers, nodes):
+    # Nodes are numbered in depth-first order, so they are appended in the order of the walk
+    keys, children = container
+    if isinstance(x, dict):
+        if tuple(x) != keys:
+            return False
+        values = x.values()
+    elif isinstance(x, (list, tuple)) and len(x) == keys:
+        values = x
+    else:
+        return False
+
+    append = nodes.append
+    for value, child in zip(values, children):
+        if child:
+            append(value)
+            if not _match(value, containers[len(nodes) - 1], containers, nodes):
+                return False
+        elif isinstance(value, (dict, list, tuple)):
+            return False
+        else:
+            append(value)
+    return True
+
+class _StructLayout:
+    """
+    Flat description of a struct shape. The tree is stored as a list of
+    (parent, key, kind, private, parent_is_list) operations in depth-first
+    order, node 0 being the root and node i + 1 being created by operation i.
+    """
+
+    def __init__(self, signature):
+        self.ops = []
+        self.keys = []
+        self.paths = []
+        self.strs = []
+        self.leaf_nodes = []
+        self.leaf_private = []
+        self.leaf_index = {}
+        self.containers = {}
+        self.dict_nodes = [0] if signature is not None and signature[0] == _DICT else []
+        self._add(signature, 0, KeyPath(), (), False)
+
+    def _add(self, signature, node, keypath, path, private):
+        if signature is None:
+            self.leaf_index[node] = len(self.leaf_nodes)
+            self.leaf_nodes.append(node)
+            self.leaf_private.append(private)
+            self.keys.append(keypath)
+            self.paths.append(path)
+            self.strs.append(str(keypath))
+            return
+
+        kind = signature[0]
+        children = signature[1:]
+        if kind == _DICT:
+            self.containers[node] = (tuple(key for key, child in children), tuple(child is not None for key, child in children))
+        else:
+            self.containers[node] = (len(children), tuple(child is not None for child in children))
+        for i, child in enumerate(children):
+            if kind == _DICT:
+                key, child = child
+                sub_keypath = keypath.append_back(DictKey(key))
+                sub_private = private or (is_str(key) and key.startswith("_"))
+            else:
+                key = i
+                sub_keypath = keypath.append_back(ListKey(i))
+                sub_private = private
+
+            child_kind = None if child is None else child[0]
+            self.ops.append((node, key, child_kind, sub_private, kind == _LIST))
+            child_node = len(self.ops)
+            if child_kind == _DICT:
+                self.dict_nodes.append(child_node)
+            self._add(child, child_node, sub_keypath, path + (key,), sub_private)
+
+    def nodes(self, x):
+        nodes = [x]
+        for parent, key, kind, private, parent_is_list in self.ops:
+            nodes.append(nodes[parent][key])
+        return nodes
+
+    def match(self, x):
+        """ match(x):
+        Returns the nodes of x (see nodes()) if x has this layout and None otherwise,
+        cheaper than comparing the layout of x
+        """
+        if 0 not in self.containers:
+            return [x] if not isinstance(x, (dict, list, tuple)) else None
+        nodes = [x]
+        return nodes if _match(x, self.containers[0], self.containers, nodes) else None
+
+    def leaves(self, x):
+        nodes = self.nodes(x)
+        return [nodes[node] for node in self.leaf_nodes]
+
+    def build(self, nodes, values, skip_private=False):
+        """ build(nodes, values):
+        Creates a new tree with the containers of nodes (see nodes()) and the given leaf values
+        """
+        result = [None] * len(nodes)
+        result[0] = _new_container(nodes[0])
+        leaf_index = self.leaf_index
+        for node, (parent, key, kind, private, parent_is_list) in enumerate(self.ops, 1):
+            if skip_private and private:
+                continue
+            if kind is None:
+                value = values[leaf_index[node]]
+            else:
+                value = _new_container(nodes[node])
+                result[node] = value
+            if parent_is_list: result[parent].append(value)
+            else:              result[parent][key] = value
+        return result
+
+    def translate(self, nodes, func, *args, **kwargs):
+        values = []
+        translators = func if is_list(func) else None
+        for node, private in zip(self.leaf_nodes, self.leaf_private):
+            value = nodes[node]
+            if private:
+                pass
+            elif translators is not None:
+                for check, translator in translators:
+                    if check(value):
+                        value = translator(value, *args, **kwargs)
+                        break
+            else:
+                value = func(value, *args, **kwargs)
+            values.append(value)
+
+        result = self.build(nodes, values, skip_private=True)
+        if 'dims' in kwargs:
+            for node in self.dict_nodes:
+                if result[node] is not None:
+                    result[node].dims = kwargs["dims"]
+        return result[0]
+
+# Leaves of these types are shared instead of copied
+_immutable_types = (str, bytes, int, float, complex, bool, type(None))
+
+def _is_immutable(x):
+    return isinstance(x, _immutable_types)
+
+def _copy(x, copy_functions=None, memo=None):
+    """ _copy(x, copy_functions, memo=None):
+    Deep copy of nested dicts, lists and tuples which keeps all container types and keys.
+    Immutable leaves are shared, the other ones are copied with the first matching
+    (check, copy) function or deepcopy. Like deepcopy, objects referenced several times
+    are copied once, memo maps the ids of the copied objects to their copies.
+    """
+    if isinstance(x, _immutable_types):
+        return x
+    if memo is None:
+        memo = {}
+    if id(x) in memo:
+        return memo[id(x)]
+
+    if isinstance(x, dict):
+        y = type(x)()
+        memo[id(x)] = y
+        for key, value in x.items():
+            y[key] = _copy(value, copy_functions, memo)
+        return y
+    if type(x) is list:
+        y = []
+        memo[id(x)] = y
+        for value in x:
+            y.append(_copy(value, copy_functions, memo))
+        return y
+    if type(x) is tuple:
+        y = tuple(_copy(value, copy_functions, memo) for value in x)
+    else:
+        for check, copy in (copy_functions or []):
+            if check(x):
+                y = copy(x)
+                break
+        else:
+            y = deepcopy(x, memo)
+    memo[id(x)] = y
+    return y
+
+def _clone(x, clone_functions):
+    # Same result as _translate(x, clone_functions + [(lambda x: True, deepcopy)]) in a single pass,
+    # immutable leaves which no clone function handles are shared instead of deepcopied
+    if isinstance(x, dict):
+        if hasattr(x, 'clone_type'): y = x.clone_type()
+        else:                        y = type(x)()
+        for key, value in x.items():
+            if not key.startswith("_"):
+                y[key] = _clone(value, clone_functions)
+        return y
+    if isinstance(x, (list, tuple)):
+        return [_clone(value, clone_functions) for value in x]
+    for check, clone in clone_functions:
+        if check(x):
+            return clone(x)
+    if isinstance(x, _immutable_types):
+        return x
+    return deepcopy(x)
+
+_layouts = {}
+_max_layouts = 1024
+
+def _layout_nodes(x, lists=True):
+    """ _layout_nodes(x, lists=True):
+    Returns the (cached) layout of x and its nodes (see _StructLayout)
+    """
+    nodes = []
+    signature = _signature(x, lists, nodes)
+    layout = _layouts.get(signature)
+    if layout is None:
+        if len(_layouts) >= _max_layouts:
+            _layouts.clear()
+        layout = _StructLayout(signature)
+        _layouts[signature] = layout
+    return layout, nodes
+
+def _layout(x, lists=True):
+    return _layout_nodes(x, lists)[0]
+
 def _value_to_str(value):
     result = ""
 
@@ -7,22 +7,239 @@
 ### See https://github.com/eddy-ilg/itypes  ###
 ### --------------------------------------- ###
 
+import io
+import pickle
 import numpy as np
 
-from ..type import is_numpy
+from ..type import is_numpy, is_dict, is_list
 from .data_struct import DataStruct
+from .helper import _copy, _layout_nodes, _is_immutable
+
+_ALIGNMENT = 64
+
+
+def _collect_arrays(x, arrays, private=False):
+    # By default only arrays which clone() copies, i.e. not below private keys
+    if is_dict(x):
+        for key, value in x.items():
+            if private or not key.startswith("_"):
+                _collect_arrays(value, arrays, private)
+    elif is_list(x):
+        for value in x:
+            _collect_arrays(value, arrays, private)
+    elif is_numpy(x) and not x.dtype.hasobject:
+        arrays[id(x)] = x
+    return arrays
+
+
+def _arena_copy(arrays, alignment=_ALIGNMENT):
+    # Copies the arrays into one contiguous buffer, each aligned to alignment bytes
+    offsets = []
+    size = 0
+    for x in arrays:
+        size = (size + alignment - 1) // alignment * alignment
+        offsets.append(size)
+        size += x.nbytes
+
+    # numpy does not align allocations to more than 16 bytes, so the arena starts at the first aligned address
+    allocation = np.empty(max(size, 1) + alignment, dtype=np.uint8)
+    start = -allocation.__array_interface__['data'][0] % alignment
+    arena = allocation[start:start + max(size, 1)]
+    copies = []
+    for x, offset in zip(arrays, offsets):
+        y = np.ndarray(x.shape, dtype=x.dtype, buffer=arena, offset=offset)
+        np.copyto(y, x)
+        copies.append(y)
+    return arena, copies
+
+
+class _PackedArray:
+    # Placeholder for an array in a packed buffer
+    __slots__ = ("offset", "shape", "dtype")
+
+    def __init__(self, offset, shape, dtype):
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+
+    def __reduce__(self):
+        return (_PackedArray, (self.offset, self.shape, self.dtype))
+
+    def view(self, arena):
+        nbytes = int(np.prod(self.shape, dtype=np.int64)) * self.dtype.itemsize
+        return arena[self.offset:self.offset + nbytes].view(self.dtype).reshape(self.shape)
+
+
+def _arena_offset(x, start, end):
+    # Offset of x in the arena starting at address start, None if x is not in it
+    if type(x) is not np.ndarray or not x.flags.c_contiguous:
+        return None
+    address = x.__array_interface__['data'][0]
+    if start <= address and address + x.nbytes <= end:
+        return address - start
+    return None
+
+
+class _HeaderPickler(pickle.Pickler):
+    # Arrays in the arena are stored as ('arena', offset, shape, dtype) references and the
+    # other mutable leaves as ('leaf', index) references into the leaves pickled with the header
+    def __init__(self, file, arena, leaf_ids):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._start = arena.__array_interface__['data'][0]
+        self._end = self._start + arena.nbytes
+        self._leaf_ids = leaf_ids
+
+    def persistent_id(self, x):
+        index = self._leaf_ids.get(id(x))
+        if index is not None:
+            return ('leaf', index)
+        offset = _arena_offset(x, self._start, self._end)
+        if offset is not None:
+            return ('arena', offset, x.shape, x.dtype.str)
+        return None
+
+
+class _HeaderUnpickler(pickle.Unpickler):
+    def __init__(self, file, arena, leaves):
+        super().__init__(file)
+        self._arena = arena
+        self._leaves = leaves
+
+    def persistent_load(self, pid):
+        if pid[0] == 'leaf':
+            return self._leaves[pid[1]]
+        kind, offset, shape, dtype = pid
+        return np.ndarray(shape, dtype=dtype, buffer=self._arena, offset=offset)
+
+
+def _pickle_header(struct, arena, leaves):
+    """ _pickle_header(struct, arena, leaves):
+    Pickles struct without the arrays in the arena and without its mutable leaves, returns
+    the pickle and the indices of the mutable leaves which have to be passed along with it
+    """
+    start = arena.__array_interface__['data'][0]
+    end = start + arena.nbytes
+    mutable = [i for i, x in enumerate(leaves) if not _is_immutable(x) and _arena_offset(x, start, end) is None]
+    leaf_ids = {id(leaves[i]): n for n, i in enumerate(mutable)}
+
+    # The copy shares all leaves, but is not packed and therefore pickled as a plain struct
+    f = io.BytesIO()
+    _HeaderPickler(f, arena, leaf_ids).dump(_copy(struct, [(lambda x: True, lambda x: x)]))
+    return f.getvalue(), mutable
+
+
+def _from_packed(header, buffer, leaves=()):
+    arena = np.frombuffer(buffer, dtype=np.uint8)
+    struct = _HeaderUnpickler(io.BytesIO(header), arena, leaves).load()
+    object.__setattr__(struct, '_arena', arena)
+    return struct
 
 
 class NumpyStruct(DataStruct):
     def clone_type(self, *args, **kwargs):
         return NumpyStruct(*args, dims=self.dims, *kwargs)
 
-    def clone(self, clone_functions=None):
+    def clone(self, clone_functions=None, arena=False):
         if clone_functions is None:
             clone_functions = []
+        if arena:
+            # All arrays are copied into a single allocation
+            arrays = _collect_arrays(self, {})
+            arena, copies = _arena_copy(list(arrays.values()))
+            copies = dict(zip(arrays.keys(), copies))
+            clone_functions.append((lambda x: id(x) in copies, lambda x: copies[id(x)]))
         clone_functions.append((is_numpy, lambda x: x.copy()))
         return super().clone(clone_functions)
 
+    def _copy_functions(self):
+        return super()._copy_functions() + [(is_numpy, lambda x: x.copy())]
+
+    def pack(self):
+        """ pack():
+        Returns a copy of the struct with all arrays in a single contiguous buffer. Pickling
+        a packed struct transfers the buffer in one piece (out-of-band with protocol 5).
+        """
+        arrays = _collect_arrays(self, {}, private=True)
+        arena, copies = _arena_copy(list(arrays.values()))
+        copies = dict(zip(arrays.keys(), copies))
+        copy_functions = [(lambda x: id(x) in copies, lambda x: copies[id(x)])] + self._copy_functions()
+        packed = _copy(self, copy_functions)
+        object.__setattr__(packed, '_arena', arena)
+        packed._pickled_header()
+        return packed
+
+    def _pickled_header(self):
+        """ _pickled_header():
+        Returns the header pickled by pack() and the current values of the mutable leaves
+        outside the packed buffer, which are pickled along with it every time
+        """
+        # The header stays valid as long as no leaf of the struct is replaced
+        layout, nodes = _layout_nodes(self)
+        leaves = [nodes[node] for node in layout.leaf_nodes]
+        cached = self.__dict__.get('_header')
+        if cached is None or cached[0] is not layout or not all(x is y for x, y in zip(cached[1], leaves)):
+            header, mutable = _pickle_header(self, self.packed_buffer(), leaves)
+            cached = (layout, leaves, header, mutable)
+            object.__setattr__(self, '_header', cached)
+        return cached[2], [leaves[i] for i in cached[3]]
+
+    def unpack(self):
+        """ unpack():
+        Returns a copy of the struct in which every array has its own memory again
+        """
+        return self.copy()
+
+    def is_packed(self):
+        return self.__dict__.get('_arena') is not None
+
+    def packed_buffer(self):
+        return self.__dict__.get('_arena')
+
+    def packed_header(self):
+        """ packed_header():
+        Returns the struct with the arrays in the packed buffer replaced by placeholders,
+        NumpyStruct.from_buffer(header, buffer) restores it
+        """
+        arena = self.packed_buffer()
+        if arena is None:
+            raise Exception("packed_header() struct is not packed")
+        start = arena.__array_interface__['data'][0]
+        end = start + arena.nbytes
+
+        def _placeholder(x):
+            # Arrays assigned after pack() are kept as they are
+            address = x.__array_interface__['data'][0]
+            if x.flags.c_contiguous and start <= address and address + x.nbytes <= end:
+                return _PackedArray(address - start, x.shape, x.dtype)
+            return x.copy()
+
+        return _copy(self, [(is_numpy, _placeholder)])
+
+    @staticmethod
+    def from_buffer(header, buffer):
+        """ from_buffer(header, buffer):
+        Creates a packed struct whose arrays are views into buffer (e.g. bytes or shared memory)
+        """
+        arena = np.frombuffer(buffer, dtype=np.uint8)
+        copy_functions = [
+            (lambda x: isinstance(x, _PackedArray), lambda x: x.view(arena)),
+            (is_numpy, lambda x: x)
+        ]
+        struct = _copy(header, copy_functions)
+        object.__setattr__(struct, '_arena', arena)
+        return struct
+
+    def __reduce_ex__(self, protocol):
+        arena = self.packed_buffer()
+        if arena is None:
+            return super().__reduce_ex__(protocol)
+        if protocol >= 5:
+            buffer = pickle.PickleBuffer(arena)
+        else:
+            buffer = bytearray(arena)
+        header, leaves = self._pickled_header()
+        return (_from_packed, (header, buffer, leaves))
+
     def translate_arrays(self, func, *args, **kwargs):
         def _translate(x, *args, **kwargs):
             if is_numpy(x):
@@ -36,9 +253,13 @@ class NumpyStruct(DataStruct):
                 func(x, *args, **kwargs)
         self.apply(_apply, *args, **kwargs)
 
-    def read(self, member, filename, dtype=None):
+    def read(self, member, filename, dtype=None, out=None):
         from ..filesystem import File
-        self[member] = File(filename).read(dtype=dtype, device="numpy", dims=self.dims)
+        data = File(filename).read(dtype=dtype, device="numpy", dims=self.dims)
+        if out is not None:
+            np.copyto(out, data, casting="unsafe")
+            data = out
+        self[member] = data
 
     def write(self, member, filename):
         from ..filesystem import File
@@ -62,3 +283,12 @@ class NumpyStruct(DataStruct):
     def _data_permute_dims(self, x, dims):
         return np.transpose(x, dims)
 
+    def _data_empty(self, x, shape, pin_memory=False):
+        return np.empty(shape, dtype=x.dtype)
+
+    def _data_copy(self, dst, src):
+        dst[...] = src
+
+    def _data_copy_batch(self, dst, srcs):
+        np.concatenate(srcs, out=dst)
+
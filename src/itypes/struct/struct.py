@@ -8,8 +8,7 @@
 ### --------------------------------------- ###
 
 from ..attr_dict import AttrDict
-from .helper import _translate, _apply, _flatten, _flatten_keys, _dict_to_str, _create_empty, KeyPath
-from copy import deepcopy
+from .helper import _dict_to_str, _create_empty, _layout, _layout_nodes, _copy, _clone, KeyPath
 from ..type import is_list
 
 
@@ -20,25 +19,35 @@ class Struct(AttrDict):
     def clone(self, clone_functions=None):
         if clone_functions is None:
             clone_functions = []
-        clone_functions.append((lambda x: True, lambda x: deepcopy(x)))
-        return _translate(self, clone_functions)
+        return _clone(self, clone_functions)
+
+    def layout(self):
+        return _layout(self)
 
     def translate(self, func, *args, **kwargs):
-        return _translate(self, func, *args, **kwargs)
+        layout, nodes = _layout_nodes(self)
+        return layout.translate(nodes, func, *args, **kwargs)
 
     def apply(self, func, *args, **kwargs):
-        _apply(self, func, *args, **kwargs)
+        layout, nodes = _layout_nodes(self)
+        for node in layout.leaf_nodes:
+            func(nodes[node], *args, **kwargs)
 
     def flatten(self):
         result = type(self)()
-        _flatten(self, None, result)
+        layout, nodes = _layout_nodes(self)
+        for key, node in zip(layout.strs, layout.leaf_nodes):
+            result[key] = nodes[node]
         return result
 
     def flat_keys(self):
-        return _flatten_keys(self, None, None)
+        return [KeyPath(key) for key in _layout(self).keys]
 
     def copy(self):
-        return deepcopy(self)
+        return _copy(self, self._copy_functions())
+
+    def _copy_functions(self):
+        return []
 
     def create_empty(self, template=None):
         return _create_empty(self, template)
@@ -78,8 +87,13 @@ class Struct(AttrDict):
         return
 
     def __contains__(self, item):
+        if not isinstance(item, KeyPath):
+            try:
+                return super().__contains__(item)
+            except:
+                return False
         try:
-            self.__getitem__(item)
+            item.get(self)
             return True
         except:
             return False
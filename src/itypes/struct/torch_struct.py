@@ -7,6 +7,7 @@
 ### See https://github.com/eddy-ilg/itypes  ###
 ### --------------------------------------- ###
 
+from .data_struct import DataStruct
 from .numpy_struct import NumpyStruct
 from ..type import is_numpy, is_torch
 
@@ -15,11 +16,14 @@ class TorchStruct(NumpyStruct):
     def clone_type(self, *args, **kwargs):
         return TorchStruct(*args, dims=self.dims, **kwargs)
 
-    def clone(self, clone_functions=None):
+    def clone(self, clone_functions=None, arena=False):
         if clone_functions is None:
             clone_functions = []
         clone_functions.append((is_torch, lambda x: x.clone()))
-        return super().clone(clone_functions)
+        return super().clone(clone_functions, arena)
+
+    def _copy_functions(self):
+        return [(is_torch, lambda x: x.clone())] + super()._copy_functions()
 
     def translate_tensors(self, func, *args, **kwargs):
         def _translate(x, *args, **kwargs):
@@ -34,9 +38,13 @@ class TorchStruct(NumpyStruct):
                 func(x, *args, **kwargs)
         self.apply(_apply, *args, **kwargs)
 
-    def read(self, member, filename, dtype=None, device=None):
+    def read(self, member, filename, dtype=None, device=None, out=None):
         from ..filesystem import File
-        self[member] = File(filename).read(dtype=dtype, device=device, dims=self.dims)
+        data = File(filename).read(dtype=dtype, device=device, dims=self.dims)
+        if out is not None:
+            self._data_copy(out, data)
+            data = out
+        self[member] = data
 
     def detach(self):
         return self.translate_tensors(lambda x: x.detach())
@@ -68,7 +76,7 @@ class TorchStruct(NumpyStruct):
 
     def _concat_data(self, x):
         import torch
-        if is_numpy(x[0]): return super()._concat_matrices(x)
+        if is_numpy(x[0]): return super()._concat_data(x)
         else:              return torch.cat(x)
 
     def _data_expand_dims(self, x):
@@ -78,3 +86,31 @@ class TorchStruct(NumpyStruct):
     def _data_permute_dims(self, x, dims):
         if is_numpy(x): return super()._data_permute_dims(x, dims)
         else:           return x.permute(dims)
+
+    def _data_empty(self, x, shape, pin_memory=False):
+        import torch
+        if is_numpy(x):
+            if not pin_memory:
+                return super()._data_empty(x, shape)
+            # Pinned host memory, torch.from_numpy() of it stays pinned
+            dtype = torch.from_numpy(x[:0]).dtype
+            return torch.empty(shape, dtype=dtype, pin_memory=True).numpy()
+        pin_memory = pin_memory and x.device.type == 'cpu'
+        return torch.empty(shape, dtype=x.dtype, device=x.device, pin_memory=pin_memory)
+
+    def _data_copy(self, dst, src):
+        import torch
+        if is_numpy(dst):
+            if is_torch(src): src = src.detach().cpu().numpy()
+            return super()._data_copy(dst, src)
+        if is_numpy(src): src = torch.from_numpy(src)
+        dst.copy_(src.reshape(dst.shape) if src.numel() == dst.numel() else src)
+
+    def _data_copy_batch(self, dst, srcs):
+        import torch
+        if is_numpy(dst):
+            return super()._data_copy_batch(dst, [src.detach().cpu().numpy() if is_torch(src) else src for src in srcs])
+        if any(is_numpy(src) or src.requires_grad for src in srcs):
+            # torch.cat() with out= does not support autograd
+            return DataStruct._data_copy_batch(self, dst, srcs)
+        torch.cat(srcs, out=dst)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# Minimal timing helpers shared by the benchmark scripts in this folder.
+# Results can be written as JSON to track regressions across releases.
+#
+
+import sys
+import json
+import time
+import platform
+import datetime
+import argparse
+
+
+def make_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--json", default=None, help="Write results as JSON to this file")
+    return parser
+
+
+class _Measurement:
+    def __init__(self, benchmark, name, count, params):
+        self._benchmark = benchmark
+        self._name = name
+        self._count = count
+        self._params = params
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        seconds = time.perf_counter() - self._start
+        if exc_type is None:
+            self._benchmark._add(self._name, seconds, self._count, self._params)
+
+
+class Benchmark:
+    def __init__(self, name):
+        self._name = name
+        self._results = []
+
+    def measure(self, name, count=None, **params):
+        return _Measurement(self, name, count, params)
+
+    def run(self, name, func, count=None, repeat=1, **params):
+        best = None
+        for i in range(0, repeat):
+            start = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        self._add(name, best, count, params)
+
+    def skip(self, name, reason, **params):
+        self._results.append({"name": name, "skipped": reason, "params": params})
+        print(f"{name:40s} skipped ({reason})")
+
+    def _add(self, name, seconds, count, params):
+        result = {"name": name, "seconds": seconds, "params": params}
+        line = f"{name:40s} {seconds:10.4f}s"
+        if count is not None:
+            result["count"] = count
+            result["us_per_op"] = seconds / max(count, 1) * 1e6
+            line += f"  {count:10d} ops  {result['us_per_op']:10.2f}us/op"
+        if len(params):
+            line += "  " + ", ".join(f"{key}={value}" for key, value in params.items())
+        self._results.append(result)
+        print(line)
+
+    def to_dict(self):
+        return {
+            "benchmark": self._name,
+            "timestamp": datetime.datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": self._results
+        }
+
+    def write(self, file):
+        if file is None:
+            return
+        with open(file, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+            f.write('\n')
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# Benchmarks dataset construction, reading and iteration on synthetic
+# datasets. Everything is generated in a temporary directory, no external
+# files are needed. With --memory the directory is mounted as a
+# MemoryFileSystem, i.e. all files are kept in memory.
+#
+# Example: ./benchmark_dataset.py --sizes 1000,100000,1000000 --json results.json
+#
+
+import random
+import shutil
+import tempfile
+import numpy as np
+from _bench import Benchmark, make_parser
+
+parser = make_parser("Dataset benchmark")
+parser.add_argument("--sizes", default="1000,100000", help="Comma separated list of dataset sizes")
+parser.add_argument("--group-size", type=int, default=1000, help="Number of items per group")
+parser.add_argument("--file-items", type=int, default=1000, help="Maximum number of items to write files for")
+parser.add_argument("--random-access", type=int, default=10000, help="Number of random ds[i] lookups")
+parser.add_argument("--memory", action="store_true", help="Keep all files in a MemoryFileSystem")
+args = parser.parse_args()
+
+from itypes import Dataset, Path, MemoryFileSystem
+
+bench = Benchmark("dataset")
+
+
+def make_dataset(root, file_items=False):
+    ds = Dataset(root.file("data.json"))
+    ds.var.create("image", "image")
+    ds.var.create("float-scalar", "value")
+    if file_items:
+        ds.var.create("image", "image_data")
+        ds.var.create("flow", "flow")
+    return ds
+
+
+def insert_items(ds, n):
+    num_groups = (n + args.group_size - 1) // args.group_size
+    index = 0
+    for i in range(0, num_groups):
+        with ds.seq.group("%06d" % i) as group:
+            for j in range(0, min(args.group_size, n - index)):
+                group.item()
+                index += 1
+
+
+def run(n, root):
+    ref = root.file("ref.png")
+    ref.write(np.zeros((4, 4, 3), dtype=np.uint8))
+    flow = root.file("ref.flo")
+    flow.write(np.zeros((4, 4, 2), dtype=np.float32))
+
+    # Construction
+    ds = make_dataset(root.cd("ds"))
+    with bench.measure("seq.group().item()", count=n, items=n):
+        insert_items(ds, n)
+
+    items = list(ds)
+    with bench.measure("set_ref()", count=n, items=n):
+        for item in items:
+            item["image"].set_ref(ref)
+
+    with bench.measure("set_data() scalar", count=n, items=n):
+        for i, item in enumerate(items):
+            item["value"].set_data(float(i))
+    del items
+
+    with bench.measure("Dataset.write()", items=n):
+        ds.write()
+
+    bulk_ds = make_dataset(root.cd("bulk"))
+    with bench.measure("Dataset.bulk_insert()", count=n, items=n):
+        bulk_ds.bulk_insert({
+            "group_id": np.arange(n) // args.group_size,
+            "image": [str(ref)] * n,
+            "value": np.arange(n, dtype=np.float64),
+        })
+    del bulk_ds
+
+    # Reading
+    with bench.measure("Dataset.read()", items=n):
+        ds = Dataset(root.cd("ds").file("data.json")).read()
+
+    k = min(n, args.random_access)
+    indices = [random.randrange(0, n) for i in range(0, k)]
+    with bench.measure("ds[i]", count=k, items=n):
+        for i in indices:
+            ds[i]
+
+    with bench.measure("iterate items", count=n, items=n):
+        for item in ds:
+            pass
+
+    with bench.measure("iterate item[var].file()", count=n, items=n):
+        for item in ds:
+            item["image"].file()
+
+    with bench.measure("Dataset.verify()", items=n):
+        ds.verify(log=False)
+    del ds
+
+    # File values and metrics on a bounded number of items
+    m = min(n, args.file_items)
+    ds = make_dataset(root.cd("files"), file_items=True)
+    insert_items(ds, m)
+    data = np.random.rand(4, 4, 3).astype(np.float32)
+    with bench.measure("set_data() image file", count=m, items=m):
+        for item in ds:
+            item["image_data"].set_data(data)
+
+    with bench.measure("data() image file", count=m, items=m):
+        for item in ds:
+            item["image_data"].data()
+
+    for item in ds:
+        item["flow"].set_ref(flow)
+
+    try:
+        import torch
+        import imetrics
+    except ImportError:
+        bench.skip("_Metric.update()", "imetrics/torch not installed", items=m)
+        return
+
+    met = ds.met.create(type="EPE", id="EPE", data="flow", ref="flow")
+    with bench.measure("_Metric.update()", count=m, items=m):
+        met.update(save_values=True)
+
+
+for size in args.sizes.split(','):
+    n = int(size)
+    print(f"--- {n} items")
+    dir = tempfile.mkdtemp(prefix="itypes-benchmark-")
+    mfs = MemoryFileSystem(dir) if args.memory else None
+    try:
+        run(n, Path(dir))
+    finally:
+        if mfs is not None:
+            mfs.unmount()
+        shutil.rmtree(dir)
+
+bench.write(args.json)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# Benchmarks encoding images with write() for each available encoder,
+# compared to the previous pipeline (convert_dtype(), PIL into a BytesIO,
+# then writing the buffer), and decoding them with read() for each
+# available decoder, including downscaled decoding with scale=.
+#
+# Example: ./benchmark_images.py --count 50 --size 540x960 --json results.json
+#
+
+import io
+import shutil
+import tempfile
+import numpy as np
+from _bench import Benchmark, make_parser
+
+parser = make_parser("Image encode and decode benchmark")
+parser.add_argument("--count", type=int, default=50, help="Number of images per measurement")
+parser.add_argument("--size", default="540x960", help="Image size as HxW")
+parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions per measurement")
+args = parser.parse_args()
+
+from itypes import File, Path
+from itypes.conversion import convert_dtype
+from itypes.filesystem.io import jpeg_encoders, image_decoders, _write_file
+
+bench = Benchmark("images")
+n = args.count
+h, w = (int(x) for x in args.size.split("x"))
+rng = np.random.default_rng(0)
+images = {
+    "float32": rng.random((h, w, 3), dtype=np.float32),
+    "uint8": (rng.random((h, w, 3)) * 255).astype(np.uint8),
+}
+# Smooth content, so that the decode measurements see realistic compression ratios
+y, x = np.mgrid[0:h, 0:w]
+smooth = np.stack(((x * 255 // w), (y * 255 // h), ((x + y) * 255 // (h + w))), axis=2).astype(np.uint8)
+smooth16 = (y * 65535 // h).astype(np.uint16)
+
+
+def write_previous(filename, data, format):
+    from PIL import Image
+    if data.dtype != np.uint8 and data.dtype != np.uint16:
+        data = convert_dtype(data, np.uint8)
+    f = io.BytesIO()
+    Image.fromarray(data.squeeze()).save(f, compress_level=1, format=format)
+    _write_file(filename, f.getvalue())
+
+
+def read_previous(filename):
+    from PIL import Image
+    value = np.asarray(Image.open(open(filename, "rb")))
+    if value.dtype == np.int32:
+        value = value.astype(np.uint16)
+    return value
+
+
+root = Path(tempfile.mkdtemp(prefix="itypes_bench_"))
+try:
+    for dtype, data in images.items():
+        bench.run(f"convert_dtype() {dtype}", lambda: [convert_dtype(data, np.uint8) for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+
+        file = root.file(f"image-{dtype}.png").str()
+        bench.run(f"png {dtype} previous", lambda: [write_previous(file, data, "PNG") for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+        bench.run(f"png {dtype} write()", lambda: [File(file).write(data) for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+
+        file = root.file(f"image-{dtype}.jpg").str()
+        bench.run(f"jpg {dtype} previous", lambda: [write_previous(file, data, "JPEG") for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+        for encoder in ["simplejpeg", "cv2", "pil"]:
+            if encoder not in jpeg_encoders():
+                bench.skip(f"jpg {dtype} write() {encoder}", "not installed")
+                continue
+            bench.run(f"jpg {dtype} write() {encoder}", lambda: [File(file).write(data, encoder=encoder) for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+
+    files = {
+        "png": root.file("decode.png").write(smooth),
+        "png 16 bit": root.file("decode16.png").write(smooth16),
+        "jpg": root.file("decode.jpg").write(smooth),
+    }
+    decoders = {"png": ["pyspng", "cv2", "pil"], "jpg": ["simplejpeg", "cv2", "pil"]}
+
+    for name, file in files.items():
+        format = file.extension()
+        bench.run(f"{name} previous", lambda: [read_previous(file.str()) for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+        for decoder in decoders[format]:
+            if decoder not in image_decoders(format):
+                bench.skip(f"{name} read() {decoder}", "not installed")
+                continue
+            bench.run(f"{name} read() {decoder}", lambda: [file.read(decoder=decoder) for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+            for scale in [1 / 2, 1 / 4]:
+                bench.run(f"{name} read(scale=1/{int(1 / scale)}) {decoder}", lambda: [file.read(decoder=decoder, scale=scale) for i in range(n)], count=n, repeat=args.repeat, size=args.size)
+finally:
+    shutil.rmtree(root.str())
+
+bench.write(args.json)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# Benchmarks creating and deriving File and Path objects, including the
+# pattern used by _Value.file() to resolve a registry path against the
+# dataset base path.
+#
+# Example: ./benchmark_paths.py --count 100000 --json results.json
+#
+
+import shutil
+import tempfile
+from _bench import Benchmark, make_parser
+
+parser = make_parser("File and Path benchmark")
+parser.add_argument("--count", type=int, default=100000, help="Number of operations per measurement")
+parser.add_argument("--items", type=int, default=10000, help="Number of dataset items to resolve files for")
+parser.add_argument("--repeat", type=int, default=3, help="Number of repetitions per measurement")
+args = parser.parse_args()
+
+from itypes import Dataset, File, Path
+
+bench = Benchmark("paths")
+n = args.count
+rel = "000042/00000007/image.png"
+base = Path("output/dataset")
+file = File(rel)
+abs_file = file.abs()
+
+bench.run("File(str)", lambda: [File(rel) for i in range(n)], count=n, repeat=args.repeat)
+bench.run("File(File)", lambda: [File(file) for i in range(n)], count=n, repeat=args.repeat)
+bench.run("File.str()", lambda: [file.str() for i in range(n)], count=n, repeat=args.repeat)
+bench.run("File.abs() relative", lambda: [file.abs() for i in range(n)], count=n, repeat=args.repeat)
+bench.run("File.abs() absolute", lambda: [abs_file.abs() for i in range(n)], count=n, repeat=args.repeat)
+bench.run("File.extension()", lambda: [file.extension() for i in range(n)], count=n, repeat=args.repeat)
+bench.run("File.clone()", lambda: [file.clone() for i in range(n)], count=n, repeat=args.repeat)
+bench.run("File.replace_extension()", lambda: [file.replace_extension("jpg") for i in range(n)], count=n, repeat=args.repeat)
+bench.run("Path.cd()", lambda: [base.cd("000042", "00000007") for i in range(n)], count=n, repeat=args.repeat)
+bench.run("Path + Path", lambda: [base + file.path() for i in range(n)], count=n, repeat=args.repeat)
+bench.run("Path.file()", lambda: [base.file("image.png") for i in range(n)], count=n, repeat=args.repeat)
+
+
+def resolve():
+    # What _Value.file() did before File and Path were immutable
+    for i in range(n):
+        f = File(rel)
+        base.cd(f.path()).abs().file(f.name())
+
+
+def resolve_cached():
+    for i in range(n):
+        f = File(rel)
+        File(f.name(), base.abs().cd(f.path()).abs())
+
+
+bench.run("resolve registry path", resolve, count=n, repeat=args.repeat)
+bench.run("resolve registry path (cached base)", resolve_cached, count=n, repeat=args.repeat)
+
+root = Path(tempfile.mkdtemp(prefix="itypes_bench_"))
+try:
+    ds = Dataset(root.file("data.json"))
+    ds.var.create("image", "image")
+    with ds.seq.group("000000") as group:
+        for i in range(0, args.items):
+            group.item()["image"].set_ref(root.file("ref.png"))
+
+    items = list(ds)
+    bench.run("_Value.file()", lambda: [item["image"].file() for item in items], count=len(items), repeat=args.repeat, items=len(items))
+finally:
+    shutil.rmtree(root.str())
+
+bench.write(args.json)
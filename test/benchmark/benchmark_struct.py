@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# Benchmarks copying, pickling and batching of deep, synthetic structs.
+#
+# Example: ./benchmark_struct.py --depth 4 --width 4 --json results.json
+#
+
+import pickle
+import numpy as np
+from copy import deepcopy
+from _bench import Benchmark, make_parser
+
+parser = make_parser("Struct benchmark")
+parser.add_argument("--depth", type=int, default=3, help="Nesting depth of the structs")
+parser.add_argument("--width", type=int, default=4, help="Number of sub-structs per level")
+parser.add_argument("--arrays", type=int, default=4, help="Number of arrays per sub-struct")
+parser.add_argument("--shape", default="1,3,8,8", help="Comma separated shape of the arrays")
+parser.add_argument("--batch", type=int, default=64, help="Number of structs to batch")
+parser.add_argument("--repeat", type=int, default=20, help="Number of repetitions per measurement")
+args = parser.parse_args()
+
+from itypes import NumpyStruct, BatchCollator
+
+bench = Benchmark("struct")
+shape = tuple(int(x) for x in args.shape.split(','))
+
+
+def make_struct(depth):
+    s = NumpyStruct(dims="bchw")
+    for i in range(0, args.arrays):
+        s[f"array{i}"] = np.random.rand(*shape).astype(np.float32)
+    s.label = "label"
+    s.index = depth
+    if depth > 1:
+        for i in range(0, args.width):
+            s[f"sub{i}"] = make_struct(depth - 1)
+    return s
+
+
+s = make_struct(args.depth)
+leaves = len(s.flat_keys())
+params = {"depth": args.depth, "width": args.width, "leaves": leaves}
+print(f"--- {leaves} leaves")
+
+n = args.repeat
+bench.run("deepcopy()", lambda: [deepcopy(s) for i in range(n)], count=n, repeat=3, **params)
+bench.run("Struct.copy()", lambda: [s.copy() for i in range(n)], count=n, repeat=3, **params)
+bench.run("Struct.clone()", lambda: [s.clone() for i in range(n)], count=n, repeat=3, **params)
+bench.run("Struct.clone(arena=True)", lambda: [s.clone(arena=True) for i in range(n)], count=n, repeat=3, **params)
+bench.run("Struct.flat_keys()", lambda: [s.flat_keys() for i in range(n)], count=n, repeat=3, **params)
+bench.run("Struct.translate()", lambda: [s.translate(lambda x: x) for i in range(n)], count=n, repeat=3, **params)
+
+
+def out_of_band(x):
+    buffers = []
+    data = pickle.dumps(x, protocol=5, buffer_callback=buffers.append)
+    return pickle.loads(data, buffers=buffers)
+
+
+packed = s.pack()
+bench.run("pickle round trip", lambda: [pickle.loads(pickle.dumps(s, protocol=5)) for i in range(n)], count=n, repeat=3, **params)
+bench.run("pickle round trip packed", lambda: [pickle.loads(pickle.dumps(packed, protocol=5)) for i in range(n)], count=n, repeat=3, **params)
+bench.run("pickle out-of-band", lambda: [out_of_band(s) for i in range(n)], count=n, repeat=3, **params)
+bench.run("pickle out-of-band packed", lambda: [out_of_band(packed) for i in range(n)], count=n, repeat=3, **params)
+
+batch = [make_struct(args.depth) for i in range(0, args.batch)]
+params["batch"] = args.batch
+bench.run("concat_batch()", lambda: s.concat_batch(batch), count=1, repeat=3, **params)
+collator = BatchCollator()
+bench.run("BatchCollator.collate()", lambda: collator.collate(batch), count=1, repeat=3, **params)
+
+b = s.concat_batch(batch)
+bench.run("split_batch()", lambda: b.split_batch(), count=1, repeat=3, **params)
+bench.run("batch_views()", lambda: b.batch_views(), count=1, repeat=3, **params)
+
+bench.write(args.json)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+
+### --------------------------------------- ###
+### Part of iTypes                          ###
+### (C) 2022 Eddy ilg (me@eddy-ilg.net)     ###
+### MIT License                             ###
+### See https://github.com/eddy-ilg/itypes  ###
+### --------------------------------------- ###
+
+#
+# Recreates a dataset into its own directory (as 'ds recreate' does)
+# and checks that the payload files survive.
+#
+
+import numpy as np
+from itypes import Dataset, Path
+
+Path('out_recreate_same_dir').remove()
+
+image = (np.arange(4 * 5 * 3) % 256).astype(np.uint8).reshape(4, 5, 3)
+ds = Dataset('out_recreate_same_dir/data.json')
+ds.var.create("image", "image")
+with ds.seq.group("group") as group:
+    group.item()["image"].set_data(image)
+ds.write()
+
+for dedup in ["copy", "hardlink"]:
+    for mode in ["copy", "link"]:
+        out_ds = Dataset('out_recreate_same_dir/data.json', dedup=dedup)
+        out_ds.copy_from(Dataset('out_recreate_same_dir/data.json').read(), mode=mode)
+
+        for item in Dataset('out_recreate_same_dir/data.json').read():
+            assert item["image"].file().exists(), f"{item['image'].file()} was removed by mode={mode}, dedup={dedup}"
+            assert np.array_equal(item["image"].data(), image), f"{item['image'].file()} was changed by mode={mode}, dedup={dedup}"
+
+print("OK")